@@ -1,21 +1,56 @@
 # users/authentication.py
-from django.contrib.auth.backends import BaseBackend
-from django.contrib.auth.models import User
-from django.db.models import Q
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+from django.db.models.functions import Lower
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
 from .models import CustomUser
 
-class EmailBackend(BaseBackend):
+class EmailBackend(ModelBackend):
+    """Log in with a case-insensitive email, served by the lower(email) unique index."""
+
     def authenticate(self, request, email=None, password=None, **kwargs):
+        # JSON bodies can carry numbers, lists or objects here
+        if not isinstance(email, str) or not isinstance(password, str):
+            return None
         try:
             # Look up the user by email
-            user = CustomUser.objects.get(email=email)
-            if user.check_password(password):
-                return user
-        except User.DoesNotExist:
+            user = CustomUser.objects.exclude(email="").alias(email_lower=Lower("email")).get(email_lower=email.strip().lower())
+        except CustomUser.DoesNotExist:
+            # Run the hasher once anyway so unknown emails take as long as wrong passwords
+            CustomUser().set_password(password)
             return None
+        if user.check_password(password) and self.user_can_authenticate(user):
+            return user
+        return None
+
+
+def user_cache_key(user_id):
+    return f"auth:user:{user_id}"
 
-    def get_user(self, user_id):
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication that keeps the resolved user in the cache for AUTH_USER_CACHE_TIMEOUT
+    seconds, so authenticated requests skip the per-request user query. Entries are dropped
+    whenever the user row is saved or deleted (see my_app.signals).
+    """
+
+    def get_user(self, validated_token):
         try:
-            return User.objects.get(id=user_id)
-        except User.DoesNotExist:
-            return None
+            user_id = validated_token[jwt_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        key = user_cache_key(user_id)
+        user = cache.get(key)
+        if user is None:
+            user = super().get_user(validated_token)
+            cache.set(key, user, getattr(settings, "AUTH_USER_CACHE_TIMEOUT", 60))
+        elif not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        return user
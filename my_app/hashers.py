@@ -0,0 +1,15 @@
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+
+
+class ConfigurablePBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """
+    PBKDF2-SHA256 with the work factor taken from PASSWORD_HASH_ITERATIONS.
+
+    Stored hashes with a different iteration count are upgraded (or downgraded) the next
+    time the user logs in, via Django's must_update/check_password rehash.
+    """
+
+    @property
+    def iterations(self):
+        return getattr(settings, "PASSWORD_HASH_ITERATIONS", PBKDF2PasswordHasher.iterations)
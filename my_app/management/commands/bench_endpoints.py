@@ -0,0 +1,154 @@
+import json
+import re
+import time
+import tracemalloc
+from dataclasses import asdict
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, URLResolver, get_resolver
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from my_project.bench import compare, summarize
+from my_project.benchdata import DatasetSize, seed
+from product.cache import CATALOG_VERSION_KEY, CATEGORY_TREE_VERSION_KEY, bump_version
+
+# URL parameter name -> Dataset attribute holding candidate primary keys
+URL_PARAMS = {
+    "category_id": "category_ids",
+    "subcategory_id": "subcategory_ids",
+    "product_id": "product_ids",
+    "cart_id": "cart_ids",
+    "order_id": "order_ids",
+}
+# Query strings for endpoints that need one to do real work
+QUERY_STRINGS = {
+    "v2/products/search": "q=bench+matte",
+    "v2/products/filter": "option=paper:matte&option=colors:red",
+    "v3/admin/orders/export": "output=csv",
+}
+PARAM_RE = re.compile(r"<(?:(?P<converter>\w+):)?(?P<name>\w+)>")
+
+
+def get_routes(patterns=None, prefix=""):
+    """(route, view class) for every API URL whose view answers GET (the Django admin site is left out)."""
+    for entry in get_resolver().url_patterns if patterns is None else patterns:
+        route = prefix + str(entry.pattern)
+        if isinstance(entry, URLResolver):
+            if entry.app_name != "admin":
+                yield from get_routes(entry.url_patterns, route)
+        elif isinstance(entry, URLPattern):
+            view_class = getattr(entry.callback, "view_class", None)
+            if view_class is not None and hasattr(view_class, "get") and "get" in view_class.http_method_names:
+                yield route, view_class
+
+
+def build_path(route, data):
+    """Fill the route's parameters from the seeded data, or return None when they can't be."""
+    def fill(match):
+        attr = URL_PARAMS.get(match["name"])
+        if match["converter"] != "int" or attr is None or not getattr(data, attr):
+            raise LookupError(match.group(0))
+        return str(getattr(data, attr)[0])
+
+    try:
+        path = "/" + PARAM_RE.sub(fill, route)
+    except LookupError:
+        return None
+    query = QUERY_STRINGS.get(route)
+    return f"{path}?{query}" if query else path
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a synthetic dataset and drive every GET endpoint through the test client, recording "
+        "latency percentiles, query counts and peak allocated memory. The data is inserted inside a "
+        "transaction that is rolled back afterwards. Pass --baseline to fail on regressions."
+    )
+
+    def add_arguments(self, parser):
+        defaults = DatasetSize()
+        parser.add_argument("--categories", type=int, default=defaults.categories)
+        parser.add_argument("--products-per-category", type=int, default=defaults.products_per_category)
+        parser.add_argument("--users", type=int, default=defaults.users)
+        parser.add_argument("--orders-per-user", type=int, default=defaults.orders_per_user)
+        parser.add_argument("--iterations", type=int, default=50, help="Timed requests per endpoint")
+        parser.add_argument("--warmup", type=int, default=3, help="Untimed requests per endpoint")
+        parser.add_argument("--path", action="append", dest="paths", help="Only routes containing this text")
+        parser.add_argument("--output", default="bench-results.json")
+        parser.add_argument("--baseline", help="Earlier --output file to compare against")
+        parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed slowdown, e.g. 0.25 = 25%%")
+
+    def handle(self, *args, **options):
+        size = DatasetSize(
+            categories=options["categories"], products_per_category=options["products_per_category"],
+            users=options["users"], orders_per_user=options["orders_per_user"],
+        )
+        client = Client(SERVER_NAME="localhost", raise_request_exception=False)
+        results = {}
+        with transaction.atomic():
+            started = time.perf_counter()
+            data = seed(size)
+            seed_seconds = time.perf_counter() - started
+            headers = {"HTTP_AUTHORIZATION": f"Bearer {RefreshToken.for_user(data.admin).access_token}"}
+            for route, _ in get_routes():
+                if options["paths"] and not any(text in route for text in options["paths"]):
+                    continue
+                path = build_path(route, data)
+                if path is None:
+                    results[route] = {"skipped": "no seeded value for its URL parameters"}
+                    continue
+                results[route] = self.measure(client, path, headers, options["iterations"], options["warmup"])
+            transaction.set_rollback(True)
+        # Cached catalog entries describe rows that no longer exist
+        bump_version(CATALOG_VERSION_KEY)
+        bump_version(CATEGORY_TREE_VERSION_KEY)
+
+        with open(options["output"], "w") as f:
+            json.dump({"dataset": asdict(size), "iterations": options["iterations"], "endpoints": results}, f, indent=2)
+        self.report(results, seed_seconds)
+
+        if options["baseline"]:
+            with open(options["baseline"]) as f:
+                baseline = json.load(f)["endpoints"]
+            regressions = compare(results, baseline, tolerance=options["tolerance"])
+            if regressions:
+                raise CommandError("Regressions against the baseline:\n" + "\n".join(regressions))
+            self.stdout.write(self.style.SUCCESS("No regressions against the baseline"))
+
+    def measure(self, client, path, headers, iterations, warmup):
+        for _ in range(warmup):
+            client.get(path, **headers)
+        latencies, queries, statuses = [], 0, set()
+        for _ in range(iterations):
+            with CaptureQueriesContext(connection) as captured:
+                request_started = time.perf_counter()
+                response = client.get(path, **headers)
+                latencies.append(time.perf_counter() - request_started)
+            queries = max(queries, len(captured))
+            statuses.add(response.status_code)
+
+        # One extra request under tracemalloc, which would distort the timings above
+        tracemalloc.start()
+        try:
+            client.get(path, **headers)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        return {
+            "path": path, **summarize(latencies), "queries": queries,
+            "peak_kib": round(peak / 1024, 1), "statuses": sorted(statuses),
+        }
+
+    def report(self, results, seed_seconds):
+        self.stdout.write(f"Seeded in {seed_seconds:.2f} s")
+        for route, stats in results.items():
+            if "skipped" in stats:
+                self.stdout.write(f"{route:<40} skipped ({stats['skipped']})")
+                continue
+            self.stdout.write(
+                f"{route:<40} p50 {stats['p50_ms']:>8.2f} ms  p99 {stats['p99_ms']:>8.2f} ms  "
+                f"{stats['queries']:>3} queries  {stats['peak_kib']:>9.1f} KiB  {stats['statuses']}"
+            )
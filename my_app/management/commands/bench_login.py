@@ -0,0 +1,50 @@
+import time
+
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.core.management.base import BaseCommand
+
+from my_app.models import CustomUser
+from my_project.bench import summarize
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure login throughput through /api/auth/login. Users are created inside a "
+        "transaction that is rolled back afterwards, so the database is left untouched."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=20)
+        parser.add_argument("--logins", type=int, default=200)
+
+    def handle(self, *args, **options):
+        client = Client(SERVER_NAME="localhost")
+        with transaction.atomic():
+            users = [
+                CustomUser.objects.create_user(
+                    username=f"bench-login-{i}", email=f"Bench.Login.{i}@example.com", password="bench-password"
+                )
+                for i in range(options["users"])
+            ]
+            latencies, queries, failures = [], 0, 0
+            started = time.perf_counter()
+            for i in range(options["logins"]):
+                email = users[i % len(users)].email.lower()
+                request_started = time.perf_counter()
+                with CaptureQueriesContext(connection) as captured:
+                    response = client.post(
+                        "/api/auth/login", {"email": email, "password": "bench-password"}, content_type="application/json"
+                    )
+                latencies.append(time.perf_counter() - request_started)
+                queries += len(captured)
+                failures += response.status_code != 200
+            elapsed = time.perf_counter() - started
+            transaction.set_rollback(True)
+
+        stats = summarize(latencies)
+        self.stdout.write(
+            f"{len(latencies) / elapsed:.1f} logins/s  p50 {stats['p50_ms']:.2f} ms  p99 {stats['p99_ms']:.2f} ms  "
+            f"{queries / len(latencies):.1f} queries/login  failures {failures}"
+        )
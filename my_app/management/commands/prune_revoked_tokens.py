@@ -0,0 +1,17 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from my_app.models import BlacklistedToken
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete expired rows from my_app's own token blacklist. simplejwt's tables are pruned by "
+        "its flushexpiredtokens command; run both so the revocation tables stay bounded."
+    )
+
+    def handle(self, *args, **options):
+        lifetime = settings.SIMPLE_JWT["REFRESH_TOKEN_LIFETIME"]
+        deleted, _ = BlacklistedToken.objects.filter(created_at__lt=timezone.now() - lifetime).delete()
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} my_app blacklist rows"))
@@ -1,4 +1,6 @@
 from django.db import models
+from django.db.models import Q
+from django.db.models.functions import Lower
 from django.contrib.auth.models import AbstractUser
 import uuid
 # Create your models here.
@@ -10,6 +12,12 @@ class CustomUser(AbstractUser):
     address = models.JSONField(default=dict)
     gst_number = models.CharField(max_length=255,null=True)
 
+    class Meta(AbstractUser.Meta):
+        constraints = [
+            # One account per email regardless of case; also the index behind email login
+            models.UniqueConstraint(Lower("email"), condition=~Q(email=""), name="customuser_email_ci_unique"),
+        ]
+
 
 class BlacklistedToken(models.Model):
     token = models.CharField(max_length=500, unique=True)
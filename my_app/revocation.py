@@ -0,0 +1,113 @@
+import threading
+import time
+from datetime import timedelta
+
+import jwt
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken as SimpleJWTBlacklistedToken
+
+from .models import BlacklistedToken
+
+REVOCATION_VERSION_KEY = "auth:revocation:version"
+
+
+def _token_claims(raw_token):
+    try:
+        return jwt.decode(raw_token, options={"verify_signature": False})
+    except jwt.PyJWTError:
+        return {}
+
+
+class RevocationFilter:
+    """
+    In-process set of revoked refresh-token jtis, mapped to their expiry timestamps.
+
+    It is loaded from simplejwt's blacklist and my_app.BlacklistedToken, then topped up
+    incrementally when another worker signals a revocation through the cache, or at the
+    latest every REVOCATION_REFRESH_INTERVAL seconds. Checks therefore cost no database
+    round trip. Expired jtis are dropped on refresh, since simplejwt rejects expired tokens
+    anyway.
+
+    Ids are assigned at insert but become visible at commit, so a row can appear below the
+    highest id already seen. Each top-up therefore also re-reads the rows created in the
+    last REVOCATION_RESCAN_WINDOW seconds, and the set is rebuilt from scratch every
+    REVOCATION_FULL_RELOAD_INTERVAL seconds, which catches transactions that ran longer
+    than that as well as revocations an admin has deleted.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._expiry = {}
+        self._simplejwt_watermark = 0
+        self._local_watermark = 0
+        self._version = None
+        self._refreshed_at = None
+        self._reloaded_at = None
+
+    def is_revoked(self, jti):
+        self._maybe_refresh()
+        return jti in self._expiry
+
+    def add(self, jti, expires_at=None):
+        with self._lock:
+            self._expiry[jti] = expires_at
+        try:
+            cache.incr(REVOCATION_VERSION_KEY)
+        except ValueError:
+            cache.set(REVOCATION_VERSION_KEY, int(time.time() * 1000), None)
+
+    def reset(self):
+        with self._lock:
+            self._expiry = {}
+            self._simplejwt_watermark = 0
+            self._local_watermark = 0
+            self._version = None
+            self._refreshed_at = None
+            self._reloaded_at = None
+
+    def _maybe_refresh(self):
+        interval = getattr(settings, "REVOCATION_REFRESH_INTERVAL", 30)
+        version = cache.get(REVOCATION_VERSION_KEY)
+        if (
+            self._refreshed_at is not None
+            and version == self._version
+            and time.monotonic() - self._refreshed_at < interval
+        ):
+            return
+        with self._lock:
+            self._refresh()
+            self._version = version
+
+    def _refresh(self):
+        simplejwt_rows = SimpleJWTBlacklistedToken.objects.all()
+        local_rows = BlacklistedToken.objects.all()
+        full_reload_interval = getattr(settings, "REVOCATION_FULL_RELOAD_INTERVAL", 60 * 60)
+        reload = self._reloaded_at is None or time.monotonic() - self._reloaded_at >= full_reload_interval
+        if not reload:
+            since = timezone.now() - timedelta(seconds=getattr(settings, "REVOCATION_RESCAN_WINDOW", 5 * 60))
+            simplejwt_rows = simplejwt_rows.filter(Q(id__gt=self._simplejwt_watermark) | Q(blacklisted_at__gte=since))
+            local_rows = local_rows.filter(Q(id__gt=self._local_watermark) | Q(created_at__gte=since))
+
+        # A full reload starts from scratch, so rows deleted since (un-revoked tokens) drop out
+        expiry = {} if reload else self._expiry
+        for row_id, jti, expires_at in simplejwt_rows.values_list("id", "token__jti", "token__expires_at"):
+            expiry[jti] = expires_at.timestamp() if expires_at else None
+            self._simplejwt_watermark = max(self._simplejwt_watermark, row_id)
+
+        for row_id, raw_token in local_rows.values_list("id", "token"):
+            claims = _token_claims(raw_token)
+            if "jti" in claims:
+                expiry[claims["jti"]] = claims.get("exp")
+            self._local_watermark = max(self._local_watermark, row_id)
+
+        now = time.time()
+        self._expiry = {jti: exp for jti, exp in expiry.items() if exp is None or exp > now}
+        self._refreshed_at = time.monotonic()
+        if reload:
+            self._reloaded_at = self._refreshed_at
+
+
+revocation_filter = RevocationFilter()
@@ -0,0 +1,12 @@
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .authentication import user_cache_key
+from .models import CustomUser
+
+
+@receiver([post_save, post_delete], sender=CustomUser)
+def invalidate_cached_user(sender, instance, **kwargs):
+    # Covers profile updates, account deletion and admin edits alike
+    cache.delete(user_cache_key(instance.pk))
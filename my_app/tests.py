@@ -1,3 +1,153 @@
-from django.test import TestCase
+import io
+from datetime import timedelta
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import IntegrityError, transaction
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken as SimpleJWTBlacklistedToken
+from rest_framework_simplejwt.token_blacklist.models import OutstandingToken
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .models import BlacklistedToken, CustomUser
+from .revocation import REVOCATION_VERSION_KEY, revocation_filter
+from .tokens import FilteredRefreshToken
+
+
+class CachedJWTAuthenticationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(
+            username="jane", email="jane@example.com", password="secret", first_name="Jane"
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {RefreshToken.for_user(self.user).access_token}")
+
+    def test_user_is_resolved_from_cache_after_first_request(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get("/api/auth/me").status_code, 200)
+        with self.assertNumQueries(0):
+            response = self.client.get("/api/auth/me")
+        self.assertEqual(response.data["first_name"], "Jane")
+
+    def test_profile_update_invalidates_cached_user(self):
+        self.client.get("/api/auth/me")
+        self.assertEqual(self.client.put("/api/auth/me", {"first_name": "Janet"}, format="json").status_code, 200)
+        self.assertEqual(self.client.get("/api/auth/me").data["first_name"], "Janet")
+
+    def test_deactivated_and_deleted_users_are_rejected(self):
+        # SessionAuthentication comes first, so DRF answers failed token auth with 403
+        self.client.get("/api/auth/me")
+        user = CustomUser.objects.get(pk=self.user.pk)
+        user.is_active = False
+        user.save()
+        self.assertEqual(self.client.get("/api/auth/me").status_code, 403)
+
+        user.delete()
+        self.assertEqual(self.client.get("/api/auth/me").status_code, 403)
+
+
+class RevocationFilterTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(username="sam", email="sam@example.com", password="secret")
+
+    def setUp(self):
+        cache.clear()
+        revocation_filter.reset()
+        self.client = APIClient()
+        self.refresh = RefreshToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {self.refresh.access_token}")
+
+    def test_logged_out_token_cannot_refresh(self):
+        response = self.client.post("/api/auth/logout", {"refresh_token": str(self.refresh)}, format="json")
+        self.assertEqual(response.status_code, 200)
+        response = self.client.post("/api/api/token/refresh", {"refresh": str(self.refresh)}, format="json")
+        self.assertEqual(response.status_code, 401)
+
+    def test_checks_do_not_hit_the_database_once_loaded(self):
+        other = RefreshToken.for_user(self.user)
+        revocation_filter.is_revoked("warm-up")
+        with self.assertNumQueries(0):
+            self.assertFalse(revocation_filter.is_revoked(other["jti"]))
+
+    def test_revocations_from_other_workers_are_picked_up_incrementally(self):
+        other = RefreshToken.for_user(self.user)
+        self.assertFalse(revocation_filter.is_revoked(other["jti"]))
+        # Another worker blacklists the token with the stock simplejwt path and bumps the version
+        RefreshToken(str(other)).blacklist()
+        cache.set(REVOCATION_VERSION_KEY, 1, None)
+        self.assertTrue(revocation_filter.is_revoked(other["jti"]))
+
+    def test_rows_committed_below_the_watermark_are_picked_up(self):
+        late, first = RefreshToken.for_user(self.user), RefreshToken.for_user(self.user)
+        RefreshToken(str(first)).blacklist()
+        self.assertTrue(revocation_filter.is_revoked(first["jti"]))
+        # A transaction that took its id earlier commits only now, below the watermark
+        row = SimpleJWTBlacklistedToken.objects.get(token__jti=first["jti"])
+        SimpleJWTBlacklistedToken.objects.create(
+            id=row.id - 1, token=OutstandingToken.objects.get(jti=late["jti"]),
+        )
+        cache.set(REVOCATION_VERSION_KEY, 1, None)
+        self.assertTrue(revocation_filter.is_revoked(late["jti"]))
+
+    def test_full_reload_forgets_deleted_revocations(self):
+        FilteredRefreshToken(str(self.refresh)).blacklist()
+        self.assertTrue(revocation_filter.is_revoked(self.refresh["jti"]))
+        SimpleJWTBlacklistedToken.objects.all().delete()  # an admin lifts the revocation
+        with override_settings(REVOCATION_FULL_RELOAD_INTERVAL=0):
+            cache.set(REVOCATION_VERSION_KEY, 1, None)
+            self.assertFalse(revocation_filter.is_revoked(self.refresh["jti"]))
+
+    def test_prune_removes_expired_local_rows(self):
+        FilteredRefreshToken(str(self.refresh)).blacklist()
+        BlacklistedToken.objects.create(token=str(self.refresh), user=self.user)
+        BlacklistedToken.objects.update(created_at=timezone.now() - timedelta(days=2))
+        call_command("prune_revoked_tokens", stdout=io.StringIO())
+        self.assertFalse(BlacklistedToken.objects.exists())
+        # simplejwt's own tables are left to its flushexpiredtokens command
+        self.assertTrue(SimpleJWTBlacklistedToken.objects.exists())
+
+
+@override_settings(
+    PASSWORD_HASHERS=["my_app.hashers.ConfigurablePBKDF2PasswordHasher"], PASSWORD_HASH_ITERATIONS=1000
+)
+class EmailLoginTests(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(username="ana", email="Ana@Example.com", password="secret")
+        self.client = APIClient()
+
+    def login(self, email, password="secret"):
+        return self.client.post("/api/auth/login", {"email": email, "password": password}, format="json")
+
+    def test_login_is_case_insensitive_and_takes_one_lookup(self):
+        # OutstandingToken insert for the refresh token is the only other query
+        with self.assertNumQueries(2):
+            response = self.login(" ana@example.COM")
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(response.data["user"]["email"], "Ana@example.com")
+        self.assertEqual(self.login("ana@example.com", "wrong").status_code, 401)
+        self.assertEqual(self.login("nobody@example.com").status_code, 401)
+
+    def test_non_string_credentials_are_rejected(self):
+        for email, password in ((123, "secret"), (["ana@example.com"], "secret"), ("ana@example.com", 123)):
+            response = self.client.post("/api/auth/login", {"email": email, "password": password}, format="json")
+            self.assertEqual(response.status_code, 401, (email, password))
+
+    def test_emails_are_unique_regardless_of_case(self):
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            CustomUser.objects.create_user(username="ana2", email="ANA@example.com", password="x")
+        # Accounts without an email are still allowed
+        CustomUser.objects.create_user(username="no-email-1", password="x")
+        CustomUser.objects.create_user(username="no-email-2", password="x")
+
+    def test_password_is_rehashed_when_work_factor_changes(self):
+        self.assertIn("$1000$", CustomUser.objects.get(pk=self.user.pk).password)
+        with self.settings(PASSWORD_HASH_ITERATIONS=1200):
+            self.assertEqual(self.login("ana@example.com").status_code, 200)
+        self.assertIn("$1200$", CustomUser.objects.get(pk=self.user.pk).password)
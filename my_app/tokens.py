@@ -0,0 +1,19 @@
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .revocation import revocation_filter
+
+
+class FilteredRefreshToken(RefreshToken):
+    """RefreshToken whose blacklist check is answered by the in-process revocation filter."""
+
+    def check_blacklist(self):
+        if revocation_filter.is_revoked(self.payload[api_settings.JTI_CLAIM]):
+            raise TokenError(_("Token is blacklisted"))
+
+    def blacklist(self):
+        blacklisted = super().blacklist()
+        revocation_filter.add(self.payload[api_settings.JTI_CLAIM], self.payload["exp"])
+        return blacklisted
@@ -6,6 +6,7 @@ from rest_framework import status
 
 from .models import BlacklistedToken
 from .serializers import UserSerializer
+from .tokens import FilteredRefreshToken
 from rest_framework.response import Response
 from django.contrib.auth import authenticate
 from rest_framework_simplejwt.tokens import RefreshToken
@@ -124,7 +125,7 @@ class LogoutView(APIView):
             if not refresh_token:
                 return Response({"error": "Refresh token is required"}, status=400)
 
-            token = RefreshToken(refresh_token)
+            token = FilteredRefreshToken(refresh_token)
             token.blacklist()  # Blacklist the refresh token
 
             return Response({"message": "Logout successful"}, status=200)
@@ -0,0 +1,43 @@
+"""Small helpers shared by the benchmark management commands."""
+import math
+import statistics
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of a list of numbers."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def summarize(latencies):
+    """Latency summary in milliseconds for a list of durations in seconds."""
+    return {
+        "count": len(latencies),
+        "mean_ms": round(statistics.fmean(latencies) * 1000, 3) if latencies else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        "max_ms": round(max(latencies, default=0.0) * 1000, 3),
+    }
+
+
+def compare(results, baseline, tolerance=0.25, floor_ms=1.0):
+    """
+    Regressions of ``results`` against ``baseline`` (both {endpoint: stats}).
+
+    Latency counts as regressed when it is more than ``tolerance`` slower and at least
+    ``floor_ms`` slower (so sub-millisecond noise is ignored); any extra query counts.
+    """
+    regressions = []
+    for endpoint, base in baseline.items():
+        current = results.get(endpoint)
+        if not current or "skipped" in current or "skipped" in base:
+            continue
+        for metric in ("p50_ms", "p99_ms"):
+            if current[metric] > base[metric] * (1 + tolerance) and current[metric] - base[metric] >= floor_ms:
+                regressions.append(f"{endpoint}: {metric} {base[metric]} -> {current[metric]}")
+        if current["queries"] > base["queries"]:
+            regressions.append(f"{endpoint}: queries {base['queries']} -> {current['queries']}")
+    return regressions
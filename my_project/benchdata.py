@@ -0,0 +1,144 @@
+"""
+Synthetic catalog/customer dataset for the benchmark commands.
+
+Everything is inserted with bulk_create, which skips model signals, so the derived
+data those signals normally maintain (search vectors, option facets, sales rollups)
+is rebuilt in one pass at the end.
+"""
+import random
+from dataclasses import dataclass, field
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+
+PAPERS = ["matte", "glossy", "satin", "linen", "kraft"]
+COLORS = ["red", "blue", "green", "black", "white", "gold"]
+STATUSES = ["Pending", "Processing", "Shipped", "Delivered", "Cancelled"]
+
+
+@dataclass
+class DatasetSize:
+    categories: int = 10
+    subcategories_per_category: int = 5
+    products_per_category: int = 50
+    images_per_product: int = 3
+    users: int = 50
+    carts_per_user: int = 5
+    orders_per_user: int = 20
+    batch_size: int = 2000
+
+
+@dataclass
+class Dataset:
+    """Primary keys of the seeded rows, used to fill URL parameters."""
+    admin: object = None
+    customer: object = None
+    category_ids: list = field(default_factory=list)
+    subcategory_ids: list = field(default_factory=list)
+    product_ids: list = field(default_factory=list)
+    cart_ids: list = field(default_factory=list)
+    order_ids: list = field(default_factory=list)
+
+
+def seed(size=None, seed_value=0):
+    """Insert a dataset of the given size and return the keys of what was created."""
+    from my_app.models import CustomUser
+    from order.models import Order
+    from order.rollups import rebuild as rebuild_rollups
+    from product.facets import rebuild_facets
+    from product.models import Cart, Category, Printing, Product, ProductImage, Size, Subcategory
+    from product.search import refresh_search_vectors
+
+    size = size or DatasetSize()
+    rng = random.Random(seed_value)
+    batch = size.batch_size
+    data = Dataset()
+
+    password = make_password("bench-password")  # hash once, not once per user
+    users = CustomUser.objects.bulk_create(
+        [
+            CustomUser(
+                username=f"bench-user-{i}", email=f"bench-user-{i}@example.com", password=password,
+                is_authorized=i == 0, is_staff=i == 0,
+            )
+            for i in range(max(size.users, 2))
+        ],
+        batch_size=batch,
+    )
+    data.admin, data.customer = users[0], users[1]
+
+    sizes = Size.objects.bulk_create(
+        Size(name=f"bench-size-{i}", price_multiplier=Decimal("1.00") + Decimal(i) / 4) for i in range(3)
+    )
+    printings = Printing.objects.bulk_create(
+        Printing(quality=f"bench-print-{i}", price_multiplier=Decimal("1.00") + Decimal(i) / 5) for i in range(2)
+    )
+
+    categories = Category.objects.bulk_create(
+        [Category(name=f"bench-category-{i}", image=f"categories/bench-{i}.png") for i in range(size.categories)],
+        batch_size=batch,
+    )
+    data.category_ids = [c.pk for c in categories]
+    subcategories = Subcategory.objects.bulk_create(
+        [
+            Subcategory(name=f"bench-subcategory-{c.pk}-{j}", parent_category=c, image=f"subcategories/bench-{c.pk}-{j}.png")
+            for c in categories
+            for j in range(size.subcategories_per_category)
+        ],
+        batch_size=batch,
+    )
+    data.subcategory_ids = [s.pk for s in subcategories]
+
+    products = Product.objects.bulk_create(
+        [
+            Product(
+                name=f"Bench product {c.pk}-{j}", category=c,
+                base_price=Decimal(rng.randint(100, 5000)) / 100, vat_percent=rng.choice([0.0, 5.0, 20.0]),
+                minimum_qty=1, qty_step_count=1,
+                options={"paper": rng.choice(PAPERS), "colors": rng.sample(COLORS, rng.randint(1, 3))},
+                image_description=f"{rng.choice(PAPERS)} stock, {rng.choice(COLORS)} print",
+            )
+            for c in categories
+            for j in range(size.products_per_category)
+        ],
+        batch_size=batch,
+    )
+    data.product_ids = [p.pk for p in products]
+    ProductImage.objects.bulk_create(
+        (
+            ProductImage(product=p, image=f"products/images/bench-{p.pk}-{k}.png")
+            for p in products
+            for k in range(size.images_per_product)
+        ),
+        batch_size=batch,
+    )
+
+    carts = Cart.objects.bulk_create(
+        (
+            Cart(user=u, product=p, size=rng.choice(sizes), printing=rng.choice(printings), quantity=rng.randint(1, 50))
+            for u in users
+            for p in rng.sample(products, min(size.carts_per_user, len(products)))
+        ),
+        batch_size=batch,
+    )
+    data.cart_ids = [c.pk for c in carts]
+
+    orders = Order.objects.bulk_create(
+        (
+            Order(
+                user=u, product=p, quantity=quantity, status=rng.choice(STATUSES),
+                shipping_address={"city": "Pune"}, billing_address={"city": "Pune"},
+                total_amount=p.base_price * quantity,
+            )
+            for u in users
+            for p in rng.choices(products, k=size.orders_per_user)
+            for quantity in [rng.randint(1, 100)]
+        ),
+        batch_size=batch,
+    )
+    data.order_ids = [o.pk for o in orders]
+
+    refresh_search_vectors(Product.objects.filter(category_id__in=data.category_ids))
+    rebuild_facets()
+    rebuild_rollups()
+    return data
@@ -0,0 +1,49 @@
+"""Database helpers shared by the apps (PostgreSQL specific)."""
+from django.db import connections, router
+
+
+def upsert(model, rows, conflict_fields, update_fields, increment=False, returning=None, batch_size=1000):
+    """
+    INSERT ``rows`` (dicts keyed by field name) with ON CONFLICT DO UPDATE, in batches.
+
+    With ``increment`` the conflicting row's ``update_fields`` are added to
+    (``col = table.col + EXCLUDED.col``) instead of replaced, which makes concurrent
+    counter bumps atomic. ``conflict_fields`` must match a unique constraint. Returns the
+    ``returning`` columns of every inserted/updated row when requested.
+    """
+    if not rows:
+        return []
+    connection = connections[router.db_for_write(model)]
+    qn = connection.ops.quote_name
+    table = qn(model._meta.db_table)
+    names = list(rows[0])
+    fields = [model._meta.get_field(name) for name in names]
+    columns = ", ".join(qn(field.column) for field in fields)
+    conflict = ", ".join(qn(model._meta.get_field(name).column) for name in conflict_fields)
+    assignments = []
+    for name in update_fields:
+        column = qn(model._meta.get_field(name).column)
+        value = f"{table}.{column} + EXCLUDED.{column}" if increment else f"EXCLUDED.{column}"
+        assignments.append(f"{column} = {value}")
+    placeholders = "(" + ", ".join(["%s"] * len(fields)) + ")"
+    returning_sql = ""
+    if returning:
+        returning_sql = " RETURNING " + ", ".join(qn(model._meta.get_field(name).column) for name in returning)
+
+    results = []
+    with connection.cursor() as cursor:
+        for start in range(0, len(rows), batch_size):
+            batch = rows[start:start + batch_size]
+            params = [
+                field.get_db_prep_save(row[name], connection)
+                for row in batch
+                for name, field in zip(names, fields)
+            ]
+            cursor.execute(
+                f"INSERT INTO {table} ({columns}) VALUES {', '.join([placeholders] * len(batch))} "
+                f"ON CONFLICT ({conflict}) DO UPDATE SET {', '.join(assignments)}{returning_sql}",
+                params,
+            )
+            if returning:
+                results.extend(cursor.fetchall())
+    return results
@@ -0,0 +1,226 @@
+"""
+Per-view request metrics, aggregated in process and exposed in Prometheus text format.
+
+MetricsMiddleware times every request, counts its database queries and query time
+through an execute_wrapper installed on each connection and records the response
+size, keyed by the resolved URL name and route. Recording is a few additions under
+one lock; nothing is written anywhere until /metrics is scraped. Each worker
+process keeps its own registry, so scrape every worker (or run one per pod) to get
+complete numbers.
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.http import HttpResponse
+from rest_framework import status
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+# Upper bounds (seconds) of the latency histogram buckets; +Inf is implicit
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+UNRESOLVED = ("<unresolved>", "")
+# Anything else is folded into "OTHER" so clients can't mint a series per made-up method
+HTTP_METHODS = frozenset({"GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS", "CONNECT", "TRACE"})
+
+
+class ViewStats:
+    __slots__ = ("requests", "errors", "buckets", "latency_sum", "queries", "query_seconds", "response_bytes")
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.latency_sum = 0.0
+        self.queries = 0
+        self.query_seconds = 0.0
+        self.response_bytes = 0
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def observe(self, labels, status_code, seconds, queries, query_seconds, response_bytes):
+        bucket = bisect_left(LATENCY_BUCKETS, seconds)
+        with self._lock:
+            stats = self._stats.get(labels)
+            if stats is None:
+                stats = self._stats[labels] = ViewStats()
+            stats.requests += 1
+            stats.errors += status_code >= 500
+            stats.buckets[bucket] += 1
+            stats.latency_sum += seconds
+            stats.queries += queries
+            stats.query_seconds += query_seconds
+            stats.response_bytes += response_bytes
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+    def render(self):
+        """The registry in Prometheus text exposition format (version 0.0.4)."""
+        with self._lock:
+            snapshot = [(labels, _copy(stats)) for labels, stats in sorted(self._stats.items())]
+
+        lines = []
+
+        def family(name, kind, help_text, value_of):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, stats in snapshot:
+                lines.append(f"{name}{{{_labels(labels)}}} {value_of(stats)}")
+
+        family("http_requests_total", "counter", "Requests handled.", lambda s: s.requests)
+        family("http_server_errors_total", "counter", "Requests answered with a 5xx status.", lambda s: s.errors)
+
+        name = "http_request_duration_seconds"
+        lines.append(f"# HELP {name} Time spent in Django, from the first middleware to the response.")
+        lines.append(f"# TYPE {name} histogram")
+        for labels, stats in snapshot:
+            label_text = _labels(labels)
+            cumulative = 0
+            for bound, count in zip((*LATENCY_BUCKETS, "+Inf"), stats.buckets):
+                cumulative += count
+                lines.append(f'{name}_bucket{{{label_text},le="{bound}"}} {cumulative}')
+            lines.append(f"{name}_sum{{{label_text}}} {stats.latency_sum:.6f}")
+            lines.append(f"{name}_count{{{label_text}}} {stats.requests}")
+
+        family("http_db_queries_total", "counter", "Database queries executed.", lambda s: s.queries)
+        family("http_db_query_duration_seconds_total", "counter", "Time spent executing database queries.",
+               lambda s: f"{s.query_seconds:.6f}")
+        family("http_response_size_bytes_total", "counter", "Response body bytes (streamed bodies are not counted).",
+               lambda s: s.response_bytes)
+        return "\n".join(lines) + "\n"
+
+
+def _copy(stats):
+    copy = ViewStats()
+    for slot in ViewStats.__slots__:
+        value = getattr(stats, slot)
+        setattr(copy, slot, list(value) if isinstance(value, list) else value)
+    return copy
+
+
+def _escape(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels):
+    view, route, method = labels
+    return f'view="{_escape(view)}",route="{_escape(route)}",method="{_escape(method)}"'
+
+
+registry = MetricsRegistry()
+
+
+class QueryTimer:
+    """Query count and wall time of one request."""
+
+    __slots__ = ("count", "seconds")
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+
+_current_timer = ContextVar("metrics_query_timer", default=None)
+
+
+def timed_execute(execute, sql, params, many, context):
+    """
+    Permanent execute_wrapper on every connection. The timer lives in a context variable
+    because async views run their queries on another thread's connection, which a
+    per-request ``connection.execute_wrapper()`` in the middleware would never see.
+    """
+    timer = _current_timer.get()
+    if timer is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timer.seconds += time.perf_counter() - started
+        timer.count += 1
+
+
+@receiver(connection_created)
+def install_query_timer(sender, connection, **kwargs):
+    # Front of the list: execute_wrapper() blocks pop() their own wrapper off the end
+    if timed_execute not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, timed_execute)
+
+
+def _view_labels(request):
+    match = getattr(request, "resolver_match", None)
+    if match is None:
+        return UNRESOLVED
+    # URL names are reused across the apps ("products", "cart"), the route tells them apart
+    return match.view_name or match.route, match.route
+
+
+class MetricsMiddleware:
+    """Records per-view latency, query count/time and response size into ``registry``."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        timer, token, started = self.start()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current_timer.reset(token)
+        self.record(request, response, time.perf_counter() - started, timer)
+        return response
+
+    async def __acall__(self, request):
+        timer, token, started = self.start()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current_timer.reset(token)
+        self.record(request, response, time.perf_counter() - started, timer)
+        return response
+
+    def start(self):
+        # Connections opened before this module was imported never sent connection_created
+        for connection in connections.all(initialized_only=True):
+            install_query_timer(None, connection)
+        timer = QueryTimer()
+        return timer, _current_timer.set(timer), time.perf_counter()
+
+    def record(self, request, response, seconds, timer):
+        if response.streaming:
+            size = int(response.get("Content-Length", 0))
+        else:
+            size = len(response.content)
+        method = request.method if request.method in HTTP_METHODS else "OTHER"
+        registry.observe(
+            (*_view_labels(request), method), response.status_code, seconds, timer.count, timer.seconds, size,
+        )
+
+
+class MetricsView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        """Prometheus scrape endpoint; admins only."""
+        if not request.user.is_authorized:
+            return Response({"error": "You are not authorized to view metrics."}, status=status.HTTP_403_FORBIDDEN)
+        return HttpResponse(registry.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
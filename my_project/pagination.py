@@ -0,0 +1,19 @@
+"""
+Pagination shared by the apps: page numbers by default, keyset (cursor) pages when the
+client asks for them with ``?pagination=cursor`` or by following a ``cursor`` link.
+"""
+from rest_framework.pagination import CursorPagination
+
+
+class KeysetPagination(CursorPagination):
+    """No COUNT(*) and no OFFSET scan; subclasses set ``page_size`` and an indexed ``ordering``."""
+
+    page_size_query_param = "page_size"
+    max_page_size = 100
+
+
+def get_paginator(request, page_class, cursor_class):
+    """An instance of ``cursor_class`` when the client wants keyset pages, of ``page_class`` otherwise."""
+    if "cursor" in request.query_params or request.query_params.get("pagination") == "cursor":
+        return cursor_class()
+    return page_class()
@@ -0,0 +1,157 @@
+"""
+Primary/replica database routing.
+
+Reads go to the primary unless a view opts in with ``use_replica()`` (or
+ReplicaReadMixin) and no transaction is open on the primary. Once anything in the
+request is routed for writing, the rest of the request reads from the primary too.
+Code that fills shared caches wraps its reads in ``use_primary()``: version keys are
+bumped when the primary changes, so a lagging replica would store old rows under
+the new version for every client. ReplicaPinningMiddleware then sets a
+short-lived cookie so the client's next requests keep reading from the primary
+until the replicas have caught up (REPLICA_LAG_TOLERANCE seconds).
+"""
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from rest_framework.permissions import SAFE_METHODS
+
+PRIMARY = "default"
+PIN_COOKIE = "db_pin_primary"
+
+
+class RoutingState:
+    """Routing decisions of one request (or one use_replica() block outside a request)."""
+
+    __slots__ = ("replica_ok", "pinned", "wrote", "replica")
+
+    def __init__(self, pinned=False):
+        self.replica_ok = False
+        self.pinned = pinned
+        self.wrote = False
+        self.replica = None
+
+
+_state = ContextVar("db_routing_state", default=None)
+
+
+@contextmanager
+def routing_state(pinned=False):
+    """Start a fresh routing state, e.g. for one request."""
+    state = RoutingState(pinned=pinned)
+    token = _state.set(state)
+    try:
+        yield state
+    finally:
+        _state.reset(token)
+
+
+@contextmanager
+def use_replica():
+    """Allow reads inside the block to go to a replica (until something writes)."""
+    state = _state.get()
+    if state is None:
+        with routing_state(), use_replica():
+            yield
+        return
+    previous, state.replica_ok = state.replica_ok, True
+    try:
+        yield
+    finally:
+        state.replica_ok = previous
+
+
+@contextmanager
+def use_primary():
+    """Read from the primary inside the block, even within a use_replica() view."""
+    state = _state.get()
+    if state is None:
+        yield
+        return
+    previous, state.replica_ok = state.replica_ok, False
+    try:
+        yield
+    finally:
+        state.replica_ok = previous
+
+
+def pin_to_primary():
+    """Send every further read of the current request to the primary."""
+    state = _state.get()
+    if state is not None:
+        state.pinned = True
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        replicas = settings.REPLICA_DATABASES
+        if state is None or not state.replica_ok or state.pinned or not replicas:
+            return PRIMARY
+        # Inside a transaction on the primary, reads must see its uncommitted writes
+        if connections[PRIMARY].in_atomic_block:
+            return PRIMARY
+        # One replica per request, so its reads see a single consistent snapshot
+        if state.replica is None:
+            state.replica = random.choice(replicas)
+        return state.replica
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.pinned = state.wrote = True
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary
+        databases = {PRIMARY, *settings.REPLICA_DATABASES}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == PRIMARY
+
+
+class ReplicaPinningMiddleware:
+    """Per-request routing state, pinned to the primary for a while after a client writes."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with routing_state(pinned=PIN_COOKIE in request.COOKIES) as state:
+            response = self.get_response(request)
+        return self.remember_write(state, response)
+
+    async def __acall__(self, request):
+        with routing_state(pinned=PIN_COOKIE in request.COOKIES) as state:
+            response = await self.get_response(request)
+        return self.remember_write(state, response)
+
+    def remember_write(self, state, response):
+        if state.wrote:
+            response.set_cookie(
+                PIN_COOKIE, "1", max_age=settings.REPLICA_LAG_TOLERANCE, httponly=True, samesite="Lax",
+            )
+        return response
+
+
+class ReplicaReadMixin:
+    """APIView mixin: GET/HEAD/OPTIONS may read from a replica."""
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method not in SAFE_METHODS:
+            return super().dispatch(request, *args, **kwargs)
+        with use_replica():
+            return super().dispatch(request, *args, **kwargs)
@@ -43,6 +43,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
     'my_app',
     'rest_framework',
     'rest_framework_simplejwt',
@@ -52,6 +53,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # First, so its timings cover the rest of the stack
+    "my_project.metrics.MetricsMiddleware",
+    "my_project.routers.ReplicaPinningMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -96,6 +100,50 @@ DATABASES = {
     }
 }
 
+# Read replicas: comma-separated hosts (host or host:port) sharing the primary's
+# name and credentials. Only views that opt in (my_project.routers) read from them.
+REPLICA_DATABASES = []
+for index, replica in enumerate(filter(None, os.getenv("DB_REPLICA_HOSTS", "").split(","))):
+    host, _, port = replica.strip().rpartition(":")
+    if not port.isdigit():
+        host, port = replica.strip(), DATABASES["default"]["PORT"]
+    DATABASES[f"replica_{index}"] = {
+        **DATABASES["default"], "HOST": host, "PORT": port, "TEST": {"MIRROR": "default"},
+    }
+    REPLICA_DATABASES.append(f"replica_{index}")
+
+DATABASE_ROUTERS = ["my_project.routers.ReplicaRouter"]
+# Seconds a client keeps reading from the primary after it wrote something
+REPLICA_LAG_TOLERANCE = int(os.getenv("REPLICA_LAG_TOLERANCE", "5"))
+
+
+# Cache
+# Catalog version bumps must reach every worker, so the cache has to be shared:
+# CACHE_LOCATION (e.g. redis://host:6379/1) selects Redis. The per-process LocMem
+# fallback is for local development only; the product.W001 check flags it
+# outside DEBUG, and its catalog entries expire after a minute.
+
+CACHE_LOCATION = os.getenv("CACHE_LOCATION", "")
+CACHES = {
+    "default": {
+        "BACKEND": os.getenv(
+            "CACHE_BACKEND",
+            "django.core.cache.backends.redis.RedisCache" if CACHE_LOCATION
+            else "django.core.cache.backends.locmem.LocMemCache",
+        ),
+        "LOCATION": CACHE_LOCATION,
+    }
+}
+
+# Other processes never see a LocMem worker's version bumps, so only trust its entries briefly
+LOCAL_CACHE = CACHES["default"]["BACKEND"].endswith("LocMemCache")
+CATALOG_CACHE_TIMEOUT = int(os.getenv("CATALOG_CACHE_TIMEOUT", 60 if LOCAL_CACHE else 60 * 60 * 24))
+# Cached product listings count as fresh this long; after that one request
+# rebuilds them while the rest keep getting the previous copy
+CATALOG_RESPONSE_FRESH_FOR = int(os.getenv("CATALOG_RESPONSE_FRESH_FOR", 5 * 60))
+CATALOG_RESPONSE_LOCK_TIMEOUT = 30  # seconds a rebuild may hold the lock
+CATALOG_RESPONSE_LOCK_WAIT = 0.5  # seconds a miss with nothing stale to serve waits for the builder
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -141,8 +189,19 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 AUTH_USER_MODEL = 'my_app.CustomUser'
 
 AUTHENTICATION_BACKENDS = [
+    'my_app.authentication.EmailBackend',          # Custom email backend, tried first for email logins
     'django.contrib.auth.backends.ModelBackend',  # Default backend
-    'my_app.authentication.EmailBackend',          # Custom email backend
+]
+
+# PBKDF2 work factor; existing hashes are rehashed transparently at the next login
+PASSWORD_HASH_ITERATIONS = int(os.getenv("PASSWORD_HASH_ITERATIONS", 870000))
+
+PASSWORD_HASHERS = [
+    "my_app.hashers.ConfigurablePBKDF2PasswordHasher",
+    "django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher",
+    "django.contrib.auth.hashers.Argon2PasswordHasher",
+    "django.contrib.auth.hashers.BCryptSHA256PasswordHasher",
+    "django.contrib.auth.hashers.ScryptPasswordHasher",
 ]
 
 REST_FRAMEWORK = {
@@ -151,7 +210,7 @@ REST_FRAMEWORK = {
      ],
       'DEFAULT_AUTHENTICATION_CLASSES': [
         'rest_framework.authentication.SessionAuthentication',
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'my_app.authentication.CachedJWTAuthentication',
     ],
     'DEFAULT_PAGINATION_CLASS':[
         'rest_framework.pagination.LimitOffsetPagination'
@@ -161,14 +220,25 @@ REST_FRAMEWORK = {
 
 
 
+# Seconds an authenticated user stays cached between requests (invalidated on save/delete)
+AUTH_USER_CACHE_TIMEOUT = 60
+
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(minutes=240),
     "REFRESH_TOKEN_LIFETIME": timedelta(days=1),
     "ROTATE_REFRESH_TOKENS": False,
     "BLACKLIST_AFTER_ROTATION": True,  # Ensure refresh tokens get blacklisted after rotation
     "AUTH_HEADER_TYPES": ("Bearer",),
+    "TOKEN_REFRESH_SERIALIZER": "my_app.serializers.FilteredTokenRefreshSerializer",
 }
 
+# Longest time another worker's logout can go unnoticed when the cache is not shared
+REVOCATION_REFRESH_INTERVAL = 30
+# Revocations committed out of id order are caught by re-reading recent rows on every
+# top-up, and anything older by a periodic full reload
+REVOCATION_RESCAN_WINDOW = 5 * 60
+REVOCATION_FULL_RELOAD_INTERVAL = 60 * 60
+
 
 INSTALLED_APPS += ['storages']
 
@@ -178,9 +248,23 @@ AWS_SECRET_ACCESS_KEY = config('AWS_SECRET_ACCESS_KEY')
 AWS_STORAGE_BUCKET_NAME = config('AWS_STORAGE_BUCKET_NAME')
 AWS_S3_REGION_NAME = config('AWS_S3_REGION_NAME', default='us-east-1')  # Change as per your AWS region
 AWS_S3_CUSTOM_DOMAIN = f'https://{AWS_STORAGE_BUCKET_NAME}.s3.amazonaws.com'
+AWS_S3_ENDPOINT_URL = config('AWS_S3_ENDPOINT_URL', default=None)  # S3-compatible stand-in (MinIO/LocalStack)
+
+# Presigned direct uploads of order design files
+ORDER_UPLOAD_URL_EXPIRY = 15 * 60  # seconds
+ORDER_UPLOAD_MAX_BYTES = 200 * 1024 * 1024
+# Design files customers may upload; anything else (e.g. HTML or SVG, which would run in the bucket's origin) is refused
+ORDER_UPLOAD_CONTENT_TYPES = ("application/pdf", "application/postscript", "image/jpeg", "image/png", "image/tiff")
 
 # Media Files Storage
 DEFAULT_FILE_STORAGE = 'storages.backends.s3boto3.S3Boto3Storage'
 
 MEDIA_URL = f'{AWS_S3_CUSTOM_DOMAIN}/media/'
 
+# Thumbnails are generated by `manage.py process_thumbnails`, never in the request
+THUMBNAIL_SIZE = (400, 400)
+THUMBNAIL_QUALITY = 80
+
+# Concurrent storage uploads per admin product create
+PRODUCT_IMAGE_UPLOAD_WORKERS = int(os.getenv("PRODUCT_IMAGE_UPLOAD_WORKERS", 8))
+
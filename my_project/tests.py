@@ -0,0 +1,203 @@
+import io
+import json
+import tempfile
+from unittest import mock, skipUnless
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connections
+from django.test import AsyncClient, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from my_app.models import CustomUser
+from product.cache import get_category_tree, get_or_build
+from product.models import Category
+from .metrics import _labels, registry
+from .routers import PIN_COOKIE, ReplicaRouter, routing_state, use_replica
+
+
+@override_settings(ALLOWED_HOSTS=["localhost"])
+class EndpointBenchmarkTests(TestCase):
+    def run_bench(self, output, *args):
+        call_command(
+            "bench_endpoints", "--categories", "2", "--products-per-category", "4", "--users", "3",
+            "--orders-per-user", "3", "--iterations", "2", "--warmup", "0", "--output", output, *args,
+            stdout=io.StringIO(),
+        )
+        with open(output) as f:
+            return json.load(f)["endpoints"]
+
+    def test_drives_every_get_endpoint_and_compares_with_a_baseline(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            baseline_path = f"{tmp}/baseline.json"
+            results = self.run_bench(baseline_path)
+
+            self.assertEqual(results["v2/products"]["statuses"], [200])
+            self.assertEqual(results["v3/orders/mine"]["statuses"], [200])
+            self.assertEqual(results["v2/products/search"]["path"], "/v2/products/search?q=bench+matte")
+            self.assertEqual(results["v2/product-detail/<int:product_id>"]["statuses"], [200])
+            self.assertNotIn("v3/quotes", results)  # POST only
+            self.assertFalse([route for route in results if route.startswith("admin/")])
+            self.assertGreater(results["v2/products"]["queries"], 0)
+            self.assertGreater(results["v2/products"]["peak_kib"], 0)
+            self.assertFalse(CustomUser.objects.filter(username__startswith="bench-user").exists())
+
+            with open(baseline_path) as f:
+                baseline = json.load(f)
+            baseline["endpoints"]["v2/products"]["queries"] = 0
+            with open(baseline_path, "w") as f:
+                json.dump(baseline, f)
+            with self.assertRaisesMessage(CommandError, "v2/products: queries 0 ->"):
+                self.run_bench(f"{tmp}/current.json", "--path", "v2/products", "--baseline", baseline_path)
+
+
+class MetricsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = CustomUser.objects.create_user(username="ops", password="secret", is_authorized=True)
+        cls.user = CustomUser.objects.create_user(username="viewer", password="secret")
+
+    def setUp(self):
+        cache.clear()
+        registry.reset()
+        self.client = APIClient()
+
+    def test_records_per_view_latency_queries_and_size(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {RefreshToken.for_user(self.user).access_token}")
+        for _ in range(3):
+            self.client.get("/api/auth/me")
+        self.assertEqual(self.client.get("/metrics").status_code, 403)
+
+        self.client.credentials()
+        self.client.force_authenticate(self.admin)
+        response = self.client.get("/metrics")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response["Content-Type"].startswith("text/plain; version=0.0.4"))
+        text = response.content.decode()
+        labels = 'view="user_view",route="api/auth/me",method="GET"'
+        self.assertIn(f"http_requests_total{{{labels}}} 3", text)
+        self.assertIn(f'http_request_duration_seconds_bucket{{{labels},le="+Inf"}} 3', text)
+        self.assertIn(f"http_request_duration_seconds_count{{{labels}}} 3", text)
+        self.assertRegex(text, rf"http_db_queries_total\{{{labels}\}} [1-9]")
+        self.assertRegex(text, rf"http_response_size_bytes_total\{{{labels}\}} [1-9]")
+
+    def test_unresolved_paths_share_one_series(self):
+        self.client.get("/nope/1")
+        self.client.get("/nope/2")
+        text = registry.render()
+        self.assertIn('http_requests_total{view="<unresolved>",route="",method="GET"} 2', text)
+
+    def test_made_up_methods_share_one_series(self):
+        self.client.generic("PURGE", "/nope/1")
+        self.client.generic('X"}', "/nope/1")
+        text = registry.render()
+        self.assertIn('http_requests_total{view="<unresolved>",route="",method="OTHER"} 2', text)
+        self.assertEqual(_labels(("v", "r", 'a"b')), 'view="v",route="r",method="a\\"b"')
+
+    async def test_async_views_are_measured(self):
+        client = AsyncClient()
+        await client.aforce_login(self.admin)
+        response = await client.get("/v2/async/category")
+        self.assertEqual(response.status_code, 200)
+        text = registry.render()
+        self.assertIn('http_requests_total{view="async-category",route="v2/async/category",method="GET"} 1', text)
+        self.assertRegex(text, r'http_db_queries_total\{view="async-category",route="v2/async/category",method="GET"\} [1-9]')
+
+
+@override_settings(REPLICA_DATABASES=["replica_a", "replica_b"])
+class ReplicaRouterTests(SimpleTestCase):
+    router = ReplicaRouter()
+
+    def test_reads_use_the_primary_unless_a_view_opts_in(self):
+        self.assertEqual(self.router.db_for_read(Category), "default")
+        with use_replica():
+            replica = self.router.db_for_read(Category)
+            self.assertIn(replica, ["replica_a", "replica_b"])
+            self.assertEqual({self.router.db_for_read(Category) for _ in range(20)}, {replica})
+        self.assertEqual(self.router.db_for_read(Category), "default")
+
+    def test_writes_pin_the_rest_of_the_request(self):
+        with routing_state() as state, use_replica():
+            self.assertNotEqual(self.router.db_for_read(Category), "default")
+            self.assertEqual(self.router.db_for_write(Category), "default")
+            self.assertEqual(self.router.db_for_read(Category), "default")
+        self.assertTrue(state.wrote)
+
+        with routing_state(pinned=True), use_replica():
+            self.assertEqual(self.router.db_for_read(Category), "default")
+
+    @override_settings(REPLICA_DATABASES=[])
+    def test_no_replicas_configured(self):
+        with use_replica():
+            self.assertEqual(self.router.db_for_read(Category), "default")
+
+    def test_cache_fills_read_from_the_primary(self):
+        cache.clear()
+        decide = lambda: self.router.db_for_read(Category)  # noqa: E731
+        with use_replica():
+            self.assertNotEqual(decide(), "default")
+            with mock.patch("product.cache.build_category_tree", side_effect=decide):
+                self.assertEqual(get_category_tree(), "default")
+            self.assertEqual(get_or_build("catalog:test", decide), ("default", True))
+            self.assertNotEqual(decide(), "default")
+
+    def test_only_the_primary_is_migrated(self):
+        self.assertTrue(self.router.allow_migrate("default", "product"))
+        self.assertFalse(self.router.allow_migrate("replica_a", "product"))
+
+
+class ReplicaPinningCookieTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(username="writer", email="writer@example.com", password="secret")
+
+    def test_cookie_set_only_after_a_write(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        response = client.get("/api/auth/me")
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+
+        response = client.post("/api/auth/login", {"email": "writer@example.com", "password": "secret"}, format="json")
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(response.cookies[PIN_COOKIE]["max-age"], settings.REPLICA_LAG_TOLERANCE)
+
+
+@skipUnless(settings.REPLICA_DATABASES, "set DB_REPLICA_HOSTS to test against a replica")
+class ReplicaReadTests(TransactionTestCase):
+    databases = {"default", *settings.REPLICA_DATABASES}
+
+    def setUp(self):
+        cache.clear()
+        self.replica = connections[settings.REPLICA_DATABASES[0]]
+        user = CustomUser.objects.create_user(username="reader", password="secret")
+        Category.objects.create(name="Flyers", image="categories/flyers.png")
+        self.client = APIClient()
+        self.client.force_authenticate(user)
+
+    def get_categories(self):
+        response = self.client.get("/v2/category")
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def get_facets(self):
+        with CaptureQueriesContext(self.replica) as replica_queries:
+            self.assertEqual(self.client.get("/v2/products/facets").status_code, 200)
+        return len(replica_queries)
+
+    @override_settings(REPLICA_DATABASES=settings.REPLICA_DATABASES[:1])
+    def test_catalog_reads_go_to_the_replica_unless_pinned(self):
+        self.assertGreater(self.get_facets(), 0)
+        self.client.cookies[PIN_COOKIE] = "1"
+        self.assertEqual(self.get_facets(), 0)
+
+    @override_settings(REPLICA_DATABASES=settings.REPLICA_DATABASES[:1])
+    def test_cache_fill_after_a_bump_never_reads_the_replica(self):
+        self.get_categories()
+        Category.objects.create(name="Posters", image="categories/posters.png")  # bumps the tree version
+        with CaptureQueriesContext(self.replica) as replica_queries:
+            self.assertEqual(len(self.get_categories()), 2)
+            self.assertEqual(self.client.get("/v2/products").status_code, 200)
+        self.assertEqual(len(replica_queries), 0)
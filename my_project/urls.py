@@ -17,9 +17,12 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include
 
+from .metrics import MetricsView
+
 urlpatterns = [
     path("admin/", admin.site.urls),
     path("api/",include("my_app.urls")),
     path("v2/", include("product.urls")),
     path("v3/", include("order.urls")),
+    path("metrics", MetricsView.as_view(), name="metrics"),
 ]
@@ -1,3 +1,8 @@
 from django.contrib import admin
+from .models import DailyCategorySales, DailyProductSales, DailyStatusSales
 
 # Register your models here.
+
+admin.site.register(DailyProductSales)
+admin.site.register(DailyCategorySales)
+admin.site.register(DailyStatusSales)
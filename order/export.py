@@ -0,0 +1,64 @@
+import csv
+import json
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from .models import Order
+
+EXPORT_FIELDS = [
+    "id", "user_id", "product_id", "quantity", "options", "shipping_address", "billing_address",
+    "files", "total_amount", "status", "created_at", "updated_at",
+]
+JSON_FIELDS = {"options", "shipping_address", "billing_address", "files"}
+
+
+class Echo:
+    """File-like object whose write() hands the line back, for csv.writer inside a generator."""
+
+    def write(self, value):
+        return value
+
+
+def _day_start(value):
+    day = parse_date(value)
+    if day is None:
+        raise ValueError(f"Invalid date: {value}. Use YYYY-MM-DD.")
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def export_queryset(date_from=None, date_to=None, order_status=None):
+    """Orders in a date range (inclusive days) in created_at order, so the scan follows the index."""
+    orders = Order.objects.all()
+    if date_from:
+        orders = orders.filter(created_at__gte=_day_start(date_from))
+    if date_to:
+        orders = orders.filter(created_at__lt=_day_start(date_to) + timedelta(days=1))
+    if order_status:
+        orders = orders.filter(status=order_status)
+    return orders.order_by("created_at", "id").values_list(*EXPORT_FIELDS)
+
+
+def _rows(queryset):
+    chunk_size = getattr(settings, "ORDER_EXPORT_CHUNK_SIZE", 2000)
+    # iterator() streams through a server-side cursor instead of loading the whole result
+    return queryset.iterator(chunk_size=chunk_size)
+
+
+def iter_ndjson(queryset):
+    for row in _rows(queryset):
+        yield json.dumps(dict(zip(EXPORT_FIELDS, row)), cls=DjangoJSONEncoder) + "\n"
+
+
+def iter_csv(queryset):
+    writer = csv.writer(Echo())
+    json_columns = [field in JSON_FIELDS for field in EXPORT_FIELDS]
+    yield writer.writerow(EXPORT_FIELDS)
+    for row in _rows(queryset):
+        yield writer.writerow([
+            json.dumps(value, cls=DjangoJSONEncoder) if is_json else value
+            for value, is_json in zip(row, json_columns)
+        ])
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from order.rollups import rebuild
+
+
+class Command(BaseCommand):
+    help = "Recompute the daily sales rollups for a range of days (all history by default)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--from", dest="date_from", help="First day to rebuild (YYYY-MM-DD)")
+        parser.add_argument("--to", dest="date_to", help="Last day to rebuild (YYYY-MM-DD)")
+
+    def handle(self, *args, **options):
+        days = []
+        for value in (options["date_from"], options["date_to"]):
+            day = parse_date(value) if value else None
+            if value and day is None:
+                raise CommandError(f"Invalid date: {value}. Use YYYY-MM-DD.")
+            days.append(day)
+        self.stdout.write(self.style.SUCCESS(f"Wrote {rebuild(*days)} rollup rows"))
@@ -1,10 +1,11 @@
 from django.db import models
 from my_app.models import CustomUser
-from product.models import Product
+from product.models import Category, Product
 
 # Create your models here.
 class Order(models.Model):
-    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name="orders")
+    # Indexed by order_user_created_at_idx (user_id is its leading column)
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name="orders", db_index=False)
     product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="orders")
     quantity = models.PositiveIntegerField()
     options = models.JSONField(default=dict, blank=True, help_text="User's custom options")
@@ -15,3 +16,52 @@ class Order(models.Model):
     status = models.CharField(max_length=50, default="Pending")
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["created_at", "id"], name="order_created_at_id_idx"),
+            # "My orders" feeds: equality prefix, then the cursor ordering, so pages are index range scans
+            models.Index(fields=["user", "created_at", "id"], name="order_user_created_at_idx"),
+            models.Index(fields=["status", "created_at", "id"], name="order_status_created_at_idx"),
+        ]
+
+
+class DailySales(models.Model):
+    """Per-day order totals, maintained incrementally by order.rollups."""
+    day = models.DateField()
+    order_count = models.IntegerField(default=0)
+    quantity = models.BigIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+
+    class Meta:
+        abstract = True
+
+
+class DailyProductSales(DailySales):
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="daily_sales")
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["day", "product"], name="dailyproductsales_day_product_unique"),
+        ]
+
+
+class DailyCategorySales(DailySales):
+    category = models.ForeignKey(Category, null=True, on_delete=models.CASCADE, related_name="daily_sales")
+
+    class Meta:
+        constraints = [
+            # Uncategorised products roll up into one NULL row per day
+            models.UniqueConstraint(
+                fields=["day", "category"], name="dailycategorysales_day_category_unique", nulls_distinct=False
+            ),
+        ]
+
+
+class DailyStatusSales(DailySales):
+    status = models.CharField(max_length=50)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["day", "status"], name="dailystatussales_day_status_unique"),
+        ]
@@ -1,6 +1,15 @@
 from rest_framework.pagination import PageNumberPagination
 
+from my_project.pagination import KeysetPagination
+
+
 class OrderPagination(PageNumberPagination):
     page_size = 5  # Number of products per page
     page_size_query_param = 'page_size'
     max_page_size = 20
+
+
+class OrderCursorPagination(KeysetPagination):
+    # Backed by the (created_at, id) index
+    page_size = 5
+    ordering = ("-created_at", "-id")
@@ -0,0 +1,134 @@
+"""
+Daily sales rollups (per product, per category, per status).
+
+Order saves and deletes move their contribution between rollup rows with
+increment-upserts, so reports read a few rows per day whatever the size of the
+orders table. Writes that bypass signals (queryset.update, raw SQL) are caught
+up with ``manage.py rebuild_sales_rollups``.
+"""
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from my_project.db import upsert
+
+from .models import DailyCategorySales, DailyProductSales, DailyStatusSales, Order
+
+# rollup model -> (rollup field, Order lookup that feeds it)
+ROLLUPS = {
+    DailyProductSales: ("product", "product_id"),
+    DailyCategorySales: ("category", "product__category_id"),
+    DailyStatusSales: ("status", "status"),
+}
+FACT_FIELDS = ["created_at", "product_id", "product__category_id", "status", "quantity", "total_amount"]
+
+
+def order_facts(order):
+    """The values of an order the rollups depend on, shaped like ``.values(*FACT_FIELDS)``."""
+    return {
+        "created_at": order.created_at, "product_id": order.product_id,
+        "product__category_id": order.product.category_id, "status": order.status,
+        "quantity": order.quantity, "total_amount": order.total_amount,
+    }
+
+
+def _accumulate(totals, facts, sign):
+    day = timezone.localdate(facts["created_at"])
+    for model, (_, lookup) in ROLLUPS.items():
+        row = totals[model, day, facts[lookup]]
+        row[0] += sign
+        row[1] += sign * facts["quantity"]
+        row[2] += sign * Decimal(facts["total_amount"])
+
+
+def apply_changes(removed=(), added=()):
+    """Subtract the ``removed`` facts and add the ``added`` ones, one upsert per rollup table."""
+    totals = defaultdict(lambda: [0, 0, Decimal("0")])
+    for facts in removed:
+        _accumulate(totals, facts, -1)
+    for facts in added:
+        _accumulate(totals, facts, 1)
+
+    rows = defaultdict(list)
+    for (model, day, key), (order_count, quantity, revenue) in totals.items():
+        if order_count or quantity or revenue:
+            field = ROLLUPS[model][0]
+            rows[model].append({"day": day, field: key, "order_count": order_count, "quantity": quantity, "revenue": revenue})
+    if not rows:
+        return
+    with transaction.atomic(savepoint=False):
+        # Fixed table order keeps concurrent writers from deadlocking against each other
+        for model in ROLLUPS:
+            upsert(
+                model, sorted(rows[model], key=lambda row: (row["day"], str(row[ROLLUPS[model][0]]))),
+                conflict_fields=["day", ROLLUPS[model][0]],
+                update_fields=["order_count", "quantity", "revenue"], increment=True,
+            )
+
+
+def record_orders(orders):
+    """Add freshly created orders (e.g. from bulk_create, which sends no signals)."""
+    apply_changes(added=[order_facts(order) for order in orders])
+
+
+def _day_start(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def rebuild(date_from=None, date_to=None):
+    """Recompute the rollups for an inclusive range of days (all history when open-ended)."""
+    orders = Order.objects.all()
+    day_filter = {}
+    if date_from:
+        orders = orders.filter(created_at__gte=_day_start(date_from))
+        day_filter["day__gte"] = date_from
+    if date_to:
+        orders = orders.filter(created_at__lt=_day_start(date_to + timedelta(days=1)))
+        day_filter["day__lte"] = date_to
+    orders = orders.annotate(day=TruncDate("created_at")).order_by()
+
+    created = 0
+    with transaction.atomic():
+        for model, (field, lookup) in ROLLUPS.items():
+            model.objects.filter(**day_filter).delete()
+            aggregated = orders.values("day", lookup).annotate(
+                order_count=Count("id"), total_quantity=Sum("quantity"), revenue=Sum("total_amount"),
+            )
+            objs = model.objects.bulk_create(
+                (
+                    model(**{
+                        "day": row["day"], model._meta.get_field(field).attname: row[lookup],
+                        "order_count": row["order_count"], "quantity": row["total_quantity"], "revenue": row["revenue"],
+                    })
+                    for row in aggregated.iterator(chunk_size=2000)
+                ),
+                batch_size=2000,
+            )
+            created += len(objs)
+    return created
+
+
+def sales_report(group, date_from, date_to):
+    """Per-day and per-key totals for an inclusive range of days, read from the rollups only."""
+    model = next((m for m, (field, _) in ROLLUPS.items() if field == group), None)
+    if model is None:
+        raise ValueError("group must be product, category or status.")
+    field = model._meta.get_field(group).attname
+    rows = model.objects.filter(day__gte=date_from, day__lte=date_to, order_count__gt=0).annotate(key=F(field))
+    series = rows.order_by("day", "key").values("day", "key", "order_count", "quantity", "revenue")
+    totals = rows.values("key").annotate(
+        orders=Sum("order_count"), units=Sum("quantity"), total_revenue=Sum("revenue"),
+    ).order_by("-total_revenue")
+    return {
+        "group": group,
+        "series": list(series),
+        "totals": [
+            {"key": row["key"], "order_count": row["orders"], "quantity": row["units"], "revenue": row["total_revenue"]}
+            for row in totals
+        ],
+    }
@@ -0,0 +1,29 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .models import Order
+from .rollups import FACT_FIELDS, apply_changes, order_facts
+
+
+@receiver(pre_save, sender=Order)
+def remember_rollup_facts(sender, instance, **kwargs):
+    old = None
+    if instance.pk is not None:
+        old = Order.objects.filter(pk=instance.pk).values(*FACT_FIELDS).first()
+    instance._old_rollup_facts = old
+
+
+@receiver(post_save, sender=Order)
+def update_rollups(sender, instance, **kwargs):
+    old = instance.__dict__.pop("_old_rollup_facts", None)
+    new = order_facts(instance)
+    if old != new:
+        apply_changes(removed=[old] if old else [], added=[new])
+
+
+@receiver(post_delete, sender=Order)
+def remove_from_rollups(sender, instance, origin=None, **kwargs):
+    # Cascades (a product or user being deleted) keep the historical totals; re-adding a
+    # row for a product that is going away would also break its foreign key
+    if isinstance(origin, Order) or getattr(origin, "model", None) is Order:
+        apply_changes(removed=[order_facts(instance)])
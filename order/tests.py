@@ -1,3 +1,347 @@
+import csv
+import io
+import json
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+
+import boto3
+from botocore.stub import Stubber
+from django.conf import settings
+from django.core.management import CommandError, call_command
+from django.db import connection
 from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from my_app.models import CustomUser
+from product.models import Category, Product, Size
+from .models import DailyCategorySales, DailyProductSales, DailyStatusSales, Order
+
+
+class OrderFixtureMixin:
+    order_count = 12
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = CustomUser.objects.create_user(
+            username="admin", email="admin@example.com", password="secret", is_authorized=True
+        )
+        cls.customer = CustomUser.objects.create_user(
+            username="customer", email="customer@example.com", password="secret"
+        )
+        cls.category = Category.objects.create(name="Posters", image="categories/posters.png")
+        cls.product = Product.objects.create(
+            name="Poster", category=cls.category, base_price=Decimal("5.00"), vat_percent=10.0,
+            minimum_qty=10, qty_step_count=5,
+        )
+        cls.orders = Order.objects.bulk_create(
+            Order(
+                user=cls.customer, product=cls.product, quantity=10,
+                shipping_address={"city": "Pune"}, billing_address={"city": "Pune"},
+                total_amount=Decimal("55.00"),
+            )
+            for _ in range(cls.order_count)
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+
+class OrderFeedPaginationTests(OrderFixtureMixin, TestCase):
+    def test_page_number_mode_still_works(self):
+        response = self.client.get("/v3/admin/orders?page=2")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["count"], self.order_count)
+        self.assertEqual(len(response.data["results"]), 5)
+
+    def test_cursor_mode_walks_every_order_once(self):
+        seen = []
+        url = "/v3/admin/orders?pagination=cursor&page_size=5"
+        while url:
+            with self.assertNumQueries(1):
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn("count", response.data)
+            seen.extend(row["id"] for row in response.data["results"])
+            url = response.data["next"]
+        self.assertEqual(seen, sorted((order.id for order in self.orders), reverse=True))
+
+
+class MyOrdersTests(OrderFixtureMixin, TestCase):
+    def test_feed_lists_only_the_callers_orders_by_status(self):
+        Order.objects.create(
+            user=self.admin, product=self.product, quantity=10,
+            shipping_address={}, billing_address={}, total_amount=Decimal("55.00"),
+        )
+        Order.objects.filter(pk__in=[o.pk for o in self.orders[:3]]).update(status="Shipped")
+        self.client.force_authenticate(self.customer)
+
+        seen = []
+        url = "/v3/orders/mine?page_size=5"
+        while url:
+            with self.assertNumQueries(1):
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            seen += [row["id"] for row in response.data["results"]]
+            url = response.data["next"]
+        self.assertEqual(seen, sorted((o.pk for o in self.orders), reverse=True))
+
+        response = self.client.get("/v3/orders/mine", {"status": "Shipped"})
+        self.assertEqual({row["id"] for row in response.data["results"]}, {o.pk for o in self.orders[:3]})
+
+    def test_feed_uses_the_user_index(self):
+        orders = Order.objects.filter(user=self.customer).order_by("-created_at", "-id")[:5]
+        with connection.cursor() as cursor:
+            cursor.execute("SET LOCAL enable_seqscan = off")
+            plan = orders.explain()
+        self.assertIn("order_user_created_at_idx", plan)
+        self.assertNotIn("Sort", plan)
+
+
+class QuoteTests(OrderFixtureMixin, TestCase):
+    def test_single_order_and_quote_agree(self):
+        payload = {
+            "product_id": self.product.id, "quantity": 10, "options": {"text": "Hello"},
+            "shipping_address": {"city": "Pune"}, "billing_address": {"city": "Pune"},
+        }
+        self.client.force_authenticate(self.customer)
+        order = self.client.post("/v3/orders", payload, format="json")
+        self.assertEqual(order.status_code, 201, order.content)
+
+        response = self.client.post("/v3/quotes", {"lines": [payload]}, format="json")
+        self.assertEqual(response.status_code, 200)
+        # base 50.00 + vat 5.00 + one customization 1.00
+        self.assertEqual(response.data["lines"][0]["total"], Decimal("56.00"))
+        self.assertEqual(Decimal(order.data["total_amount"]), response.data["lines"][0]["total"])
+
+    def test_batch_costs_fixed_queries_and_reports_bad_lines(self):
+        size = Size.objects.create(name="A3", price_multiplier=Decimal("2.00"))
+        lines = [{"product_id": self.product.id, "quantity": 10 + 5 * i, "size_id": size.id} for i in range(50)]
+        lines.append({"product_id": self.product.id, "quantity": 7})
+        lines.append({"product_id": 999999, "quantity": 10})
+        # products + sizes
+        with self.assertNumQueries(2):
+            response = self.client.post("/v3/quotes", {"lines": lines}, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["lines"][0]["base"], Decimal("100.00"))
+        self.assertIn("error", response.data["lines"][-2])
+        self.assertEqual(response.data["lines"][-1], {"error": "Product not found."})
+
+    def test_malformed_ids_fail_only_their_line(self):
+        line = {"product_id": self.product.id, "quantity": 10}
+        bad = [{"product_id": "abc"}, {"product_id": [1]}, {"size_id": {"id": 1}}]
+        response = self.client.post("/v3/quotes", {"lines": [line, *({**line, **b} for b in bad)]}, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("error", response.data["lines"][0])
+        self.assertEqual([r["error"] for r in response.data["lines"][1:]], [
+            "product_id must be an integer id.", "product_id must be an integer id.", "size_id must be an integer id.",
+        ])
+
+
+class BulkOrderTests(OrderFixtureMixin, TestCase):
+    def test_bulk_upload_costs_a_handful_of_queries(self):
+        address = {"city": "Pune"}
+        orders = [
+            {"product_id": self.product.id, "quantity": 10, "shipping_address": address, "billing_address": address}
+            for _ in range(200)
+        ]
+        orders.append({"product_id": self.product.id, "quantity": 3, "shipping_address": address, "billing_address": address})
+        orders.append({"product_id": self.product.id, "quantity": 10})
+        self.client.force_authenticate(self.customer)
+
+        # products, savepoint, insert, one rollup upsert per table, release
+        with self.assertNumQueries(7):
+            response = self.client.post("/v3/orders/bulk", {"orders": orders}, format="json")
+
+        self.assertEqual(response.status_code, 207, response.content)
+        self.assertEqual(response.data["created"], 200)
+        self.assertEqual(response.data["failed"], 2)
+        self.assertEqual(response.data["results"][0]["total_amount"], Decimal("55.00"))
+        self.assertEqual([r["index"] for r in response.data["results"] if r["status"] == "error"], [200, 201])
+        self.assertEqual(Order.objects.filter(user=self.customer).count(), self.order_count + 200)
+        self.assertEqual(DailyProductSales.objects.get(product=self.product).order_count, 200)
+
+
+    def test_malformed_id_fails_only_its_item(self):
+        address = {"city": "Pune"}
+        order = {"product_id": self.product.id, "quantity": 10, "shipping_address": address, "billing_address": address}
+        self.client.force_authenticate(self.customer)
+        response = self.client.post(
+            "/v3/orders/bulk", {"orders": [order, {**order, "product_id": "abc"}, {**order, "printing_id": [1]}]},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 207, response.content)
+        self.assertEqual(response.data["created"], 1)
+        self.assertEqual([r["index"] for r in response.data["results"] if r["status"] == "error"], [1, 2])
+        self.assertEqual(Order.objects.filter(user=self.customer).count(), self.order_count + 1)
+
+
+class SalesRollupTests(OrderFixtureMixin, TestCase):
+    def place_order(self, **kwargs):
+        return Order.objects.create(
+            user=self.customer, product=self.product, quantity=10,
+            shipping_address={}, billing_address={}, total_amount=Decimal("55.00"), **kwargs,
+        )
+
+    def rollup_state(self):
+        return {
+            model.__name__: sorted(model.objects.filter(order_count__gt=0).values_list(*fields))
+            for model, fields in (
+                (DailyProductSales, ("day", "product_id", "order_count", "quantity", "revenue")),
+                (DailyCategorySales, ("day", "category_id", "order_count", "quantity", "revenue")),
+                (DailyStatusSales, ("day", "status", "order_count", "quantity", "revenue")),
+            )
+        }
+
+    def test_signals_keep_rollups_equal_to_a_rebuild(self):
+        call_command("rebuild_sales_rollups", stdout=io.StringIO())
+        shipped = self.place_order()
+        shipped.status = "Shipped"
+        shipped.quantity = 20
+        shipped.total_amount = Decimal("110.00")
+        shipped.save()
+        self.place_order().delete()
+        incremental = self.rollup_state()
+
+        call_command("rebuild_sales_rollups", stdout=io.StringIO())
+        self.assertEqual(incremental, self.rollup_state())
+        today = timezone.localdate()
+        self.assertIn((today, "Shipped", 1, 20, Decimal("110.00")), incremental["DailyStatusSales"])
+        self.assertIn((today, self.product.pk, self.order_count + 1, 140, Decimal("770.00")), incremental["DailyProductSales"])
+
+    def test_rebuild_only_touches_the_requested_days(self):
+        old_day = timezone.localdate() - timedelta(days=10)
+        DailyStatusSales.objects.create(day=old_day, status="Pending", order_count=7, quantity=70, revenue=Decimal("1.00"))
+        call_command("rebuild_sales_rollups", "--from", timezone.localdate().isoformat(), stdout=io.StringIO())
+        self.assertEqual(DailyStatusSales.objects.get(day=old_day).order_count, 7)
+        with self.assertRaises(CommandError):
+            call_command("rebuild_sales_rollups", "--from", "yesterday")
+
+    def test_deleting_a_product_keeps_history_consistent(self):
+        other = Product.objects.create(name="Flyer", base_price=Decimal("1.00"))
+        Order.objects.create(
+            user=self.customer, product=other, quantity=1, shipping_address={}, billing_address={}, total_amount=Decimal("1.00"),
+        )
+        other.delete()
+        self.assertFalse(DailyProductSales.objects.filter(product_id=other.pk).exists())
+
+    def test_report_reads_only_rollups(self):
+        call_command("rebuild_sales_rollups", stdout=io.StringIO())
+        with self.assertNumQueries(2):
+            response = self.client.get("/v3/admin/reports/sales", {"group": "category"})
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(response.data["totals"], [
+            {"key": self.category.pk, "order_count": self.order_count, "quantity": 120, "revenue": Decimal("660.00")},
+        ])
+        self.assertEqual(len(response.data["series"]), 1)
+        self.assertEqual(self.client.get("/v3/admin/reports/sales", {"group": "user"}).status_code, 400)
+        self.assertEqual(self.client.get("/v3/admin/reports/sales", {"from": "2026-13-01"}).status_code, 400)
+
+        self.client.force_authenticate(self.customer)
+        self.assertEqual(self.client.get("/v3/admin/reports/sales").status_code, 403)
+
+
+class OrderExportTests(OrderFixtureMixin, TestCase):
+    def export(self, query=""):
+        response = self.client.get(f"/v3/admin/orders/export{query}")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return b"".join(response.streaming_content).decode()
+
+    def test_ndjson_export(self):
+        lines = self.export().splitlines()
+        self.assertEqual(len(lines), self.order_count)
+        row = json.loads(lines[0])
+        self.assertEqual(row["id"], self.orders[0].id)
+        self.assertEqual(row["shipping_address"], {"city": "Pune"})
+
+    def test_csv_export_with_filters(self):
+        Order.objects.filter(id=self.orders[0].id).update(status="Shipped")
+        rows = list(csv.reader(io.StringIO(self.export("?output=csv&status=Shipped"))))
+        self.assertEqual(rows[0][0], "id")
+        self.assertEqual([row[0] for row in rows[1:]], [str(self.orders[0].id)])
+        self.assertEqual(self.export("?from=2000-01-01&to=2000-01-02"), "")
+
+    def test_customers_cannot_export(self):
+        self.client.force_authenticate(self.customer)
+        self.assertEqual(self.client.get("/v3/admin/orders/export").status_code, 403)
+
+
+class OrderFileUploadTests(OrderFixtureMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.customer)
+        self.s3 = boto3.client(
+            "s3", region_name="us-east-1", endpoint_url="http://localhost:9000",
+            aws_access_key_id="test", aws_secret_access_key="test",
+        )
+        self.stubber = Stubber(self.s3)
+        self.stubber.activate()
+        self.addCleanup(self.stubber.deactivate)
+        patcher = mock.patch("order.uploads.get_s3_client", return_value=self.s3)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.order = self.orders[0]
+
+    def test_presign_then_complete_records_file(self):
+        response = self.client.post(
+            f"/v3/orders/{self.order.id}/files/presign",
+            {"filename": "../print ready.pdf", "content_type": "application/pdf"}, format="json",
+        )
+        self.assertEqual(response.status_code, 201, response.content)
+        key = response.data["key"]
+        self.assertTrue(key.startswith(f"orders/{self.order.id}/"))
+        self.assertTrue(key.endswith("/print_ready.pdf"))
+        self.assertEqual(response.data["fields"]["key"], key)
+        self.assertTrue(response.data["url"].startswith("http://localhost:9000/"))
+
+        self.stubber.add_response(
+            "head_object", {"ContentLength": 4096, "ContentType": "application/pdf"},
+            {"Bucket": settings.AWS_STORAGE_BUCKET_NAME, "Key": key},
+        )
+        response = self.client.post(f"/v3/orders/{self.order.id}/files/complete", {"key": key}, format="json")
+        self.assertEqual(response.status_code, 200, response.content)
+        self.order.refresh_from_db()
+        self.assertEqual(len(self.order.files), 1)
+        self.assertEqual(self.order.files[0]["size"], 4096)
+        self.assertEqual(self.order.files[0]["name"], "print_ready.pdf")
+
+    def test_complete_rejects_missing_objects_and_foreign_keys(self):
+        key = f"orders/{self.order.id}/abc/logo.png"
+        self.stubber.add_client_error("head_object", service_error_code="404", http_status_code=404)
+        response = self.client.post(f"/v3/orders/{self.order.id}/files/complete", {"key": key}, format="json")
+        self.assertEqual(response.status_code, 400)
+
+        response = self.client.post(
+            f"/v3/orders/{self.order.id}/files/complete", {"key": "orders/999/abc/logo.png"}, format="json"
+        )
+        self.assertEqual(response.status_code, 400)
+        for bad in (["orders/"], {"key": key}, f"orders/{self.order.id}/../999/logo.png"):
+            response = self.client.post(f"/v3/orders/{self.order.id}/files/complete", {"key": bad}, format="json")
+            self.assertEqual(response.status_code, 400, bad)
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.files, [])
+
+    def test_presign_only_allows_design_file_types(self):
+        url = f"/v3/orders/{self.order.id}/files/presign"
+        response = self.client.post(url, {"filename": "page.html", "content_type": "text/html"}, format="json")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.client.post(url, {"filename": "logo.svg"}, format="json").status_code, 400)
+        for filename in ("", "..", ["logo.png"]):
+            self.assertEqual(self.client.post(url, {"filename": filename}, format="json").status_code, 400, filename)
+        # The type is guessed from the filename when the browser sends none
+        response = self.client.post(url, {"filename": "logo.png"}, format="json")
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(response.data["fields"]["Content-Type"], "image/png")
 
-# Create your tests here.
+    def test_other_customers_cannot_upload(self):
+        stranger = CustomUser.objects.create_user(username="stranger", email="s@example.com", password="secret")
+        self.client.force_authenticate(stranger)
+        response = self.client.post(f"/v3/orders/{self.order.id}/files/presign", {"filename": "a.pdf"}, format="json")
+        self.assertEqual(response.status_code, 403)
+        key = f"orders/{self.order.id}/abc/logo.png"
+        response = self.client.post(f"/v3/orders/{self.order.id}/files/complete", {"key": key}, format="json")
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(self.client.post(f"/v3/orders/{self.order.id}/files/delete", {}).status_code, 404)
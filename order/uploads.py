@@ -0,0 +1,86 @@
+import mimetypes
+import uuid
+from pathlib import PurePosixPath
+
+import boto3
+from botocore.config import Config
+from botocore.exceptions import ClientError
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.db import transaction
+from django.utils import timezone
+from django.utils.text import get_valid_filename
+
+from .models import Order
+
+
+class UploadError(ValueError):
+    pass
+
+
+def get_s3_client():
+    # AWS_S3_ENDPOINT_URL points the client at an S3-compatible stand-in (MinIO, LocalStack) locally
+    return boto3.client(
+        "s3",
+        region_name=settings.AWS_S3_REGION_NAME,
+        endpoint_url=getattr(settings, "AWS_S3_ENDPOINT_URL", None),
+        aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
+        aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
+        config=Config(signature_version="s3v4"),
+    )
+
+
+def key_prefix(order):
+    return f"orders/{order.id}/"
+
+
+def presign_upload(order, filename, content_type, client=None):
+    """Presigned POST that lets the browser upload one design file straight to the bucket."""
+    try:
+        filename = get_valid_filename(PurePosixPath(filename).name)
+    except (SuspiciousFileOperation, TypeError):
+        raise UploadError("filename is required.")
+    content_type = content_type or mimetypes.guess_type(filename)[0]
+    allowed = getattr(settings, "ORDER_UPLOAD_CONTENT_TYPES", ())
+    if content_type not in allowed:
+        raise UploadError(f"content_type must be one of: {', '.join(allowed)}.")
+    key = f"{key_prefix(order)}{uuid.uuid4().hex}/{filename}"
+    expires_in = getattr(settings, "ORDER_UPLOAD_URL_EXPIRY", 15 * 60)
+    post = (client or get_s3_client()).generate_presigned_post(
+        Bucket=settings.AWS_STORAGE_BUCKET_NAME,
+        Key=key,
+        Fields={"Content-Type": content_type},
+        Conditions=[
+            {"Content-Type": content_type},
+            ["content-length-range", 1, getattr(settings, "ORDER_UPLOAD_MAX_BYTES", 200 * 1024 * 1024)],
+        ],
+        ExpiresIn=expires_in,
+    )
+    return {"url": post["url"], "fields": post["fields"], "key": key, "expires_in": expires_in}
+
+
+def complete_upload(order, key, client=None):
+    """Confirm an uploaded object exists and record its metadata in ``order.files``."""
+    if not isinstance(key, str) or not key.startswith(key_prefix(order)) or ".." in PurePosixPath(key).parts:
+        raise UploadError("Unknown upload key for this order.")
+    try:
+        head = (client or get_s3_client()).head_object(Bucket=settings.AWS_STORAGE_BUCKET_NAME, Key=key)
+    except ClientError:
+        raise UploadError("The file has not been uploaded yet.")
+
+    entry = {
+        "key": key,
+        "name": PurePosixPath(key).name,
+        "size": head["ContentLength"],
+        "content_type": head.get("ContentType", ""),
+        "uploaded_at": timezone.now().isoformat(),
+    }
+    with transaction.atomic():
+        # Lock the row so concurrent completions append instead of overwriting each other
+        order = Order.objects.select_for_update().get(pk=order.pk)
+        files = list(order.files or [])
+        if not any(isinstance(f, dict) and f.get("key") == key for f in files):
+            files.append(entry)
+            order.files = files
+            order.save(update_fields=["files", "updated_at"])
+    return order
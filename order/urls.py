@@ -1,8 +1,15 @@
 from django.urls import path 
-from .views import OrderCreateView, OrderPaginatedView
+from .views import BulkOrderCreateView, MyOrdersView, OrderCreateView, OrderExportView, OrderFileCompleteView, OrderFilePresignView, OrderPaginatedView, QuoteView, SalesReportView
 
 urlpatterns=[
     path("orders", OrderCreateView.as_view(), name="create-order"),
+    path("orders/bulk", BulkOrderCreateView.as_view(), name="bulk-create-order"),
+    path("orders/mine", MyOrdersView.as_view(), name="my-orders"),
     path("orders/<int:order_id>", OrderCreateView.as_view(), name="order"),
+    path("orders/<int:order_id>/files/presign", OrderFilePresignView.as_view(), name="order-file-presign"),
+    path("orders/<int:order_id>/files/complete", OrderFileCompleteView.as_view(), name="order-file-complete"),
     path("admin/orders", OrderPaginatedView.as_view(), name="get-order"),   
+    path("admin/orders/export", OrderExportView.as_view(), name="export-orders"),
+    path("admin/reports/sales", SalesReportView.as_view(), name="sales-report"),
+    path("quotes", QuoteView.as_view(), name="quotes"),
 ]
\ No newline at end of file
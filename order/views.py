@@ -1,4 +1,10 @@
+from datetime import timedelta
 from decimal import Decimal
+from django.conf import settings
+from django.db import router, transaction
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
@@ -6,7 +12,13 @@ from .models import Product, Order
 from .serializers import OrderSerializer
 from django.shortcuts import get_object_or_404
 from rest_framework.permissions import IsAuthenticated
-from .pagination import OrderPagination
+from .pagination import OrderCursorPagination, OrderPagination
+from .export import export_queryset, iter_csv, iter_ndjson
+from .rollups import record_orders, sales_report
+from .uploads import UploadError, complete_upload, presign_upload
+from my_project.pagination import get_paginator
+from my_project.routers import ReplicaReadMixin
+from product.pricing import PricingError, quote, quote_lines, validate_quantity
 
 class OrderCreateView(APIView):
     permission_classes = [IsAuthenticated]
@@ -25,14 +37,13 @@ class OrderCreateView(APIView):
             product = get_object_or_404(Product, id=product_id)
 
             # Validate quantity
-            if quantity < product.minimum_qty or quantity % product.qty_step_count != 0:
-                return Response({"error": "Invalid quantity. Must be at least minimum quantity and in multiples of step count."}, status=status.HTTP_400_BAD_REQUEST)
+            try:
+                validate_quantity(product, quantity)
+            except PricingError as e:
+                return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
             # Calculate total price
-            base_price = product.base_price * quantity
-            design_charge = product.additional_design_charge * quantity
-            vat = (Decimal(str(product.vat_percent)) / Decimal("100")) * base_price
-            total_price = base_price + design_charge + product.delivery_charges + vat
+            total_price = quote(product, quantity, options=options)["total"]
 
             # Save order
             order = Order.objects.create(
@@ -70,16 +81,16 @@ class OrderCreateView(APIView):
             return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
-class OrderPaginatedView(APIView):
+class OrderPaginatedView(ReplicaReadMixin, APIView):
         permission_classes = [IsAuthenticated]
 
         def get(self, request):
 
             try:
                 
-                # Apply pagination
-                paginator = OrderPagination()
-                order = Order.objects.all()
+                # Apply pagination (?pagination=cursor switches to keyset pages)
+                paginator = get_paginator(request, OrderPagination, OrderCursorPagination)
+                order = Order.objects.order_by("-created_at", "-id")
                 paginated_products = paginator.paginate_queryset(order, request)
 
                 serializer = OrderSerializer(paginated_products, many=True)
@@ -87,3 +98,227 @@ class OrderPaginatedView(APIView):
 
             except Exception as e:
                 return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class MyOrdersView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        """The caller's own orders, newest first, optionally ?status=..., cursor-paginated."""
+        try:
+            orders = Order.objects.filter(user=request.user).order_by("-created_at", "-id")
+            order_status = request.query_params.get("status")
+            if order_status:
+                orders = orders.filter(status=order_status)
+
+            paginator = OrderCursorPagination()
+            page = paginator.paginate_queryset(orders, request)
+            serializer = OrderSerializer(page, many=True)
+            return paginator.get_paginated_response(serializer.data)
+
+        except Exception as e:
+            return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class QuoteView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        """
+        Price many lines in one call.
+
+        Body: {"lines": [{"product_id", "quantity", "size_id", "printing_id", "options"}, ...]}
+        """
+        lines = request.data.get("lines") if isinstance(request.data, dict) else request.data
+        if not isinstance(lines, list) or not lines:
+            return Response({"error": "lines must be a non-empty list."}, status=status.HTTP_400_BAD_REQUEST)
+        max_lines = getattr(settings, "QUOTE_MAX_LINES", 5000)
+        if len(lines) > max_lines:
+            return Response({"error": f"At most {max_lines} lines can be quoted at once."}, status=status.HTTP_400_BAD_REQUEST)
+        if not all(isinstance(line, dict) for line in lines):
+            return Response({"error": "Each line must be an object."}, status=status.HTTP_400_BAD_REQUEST)
+
+        results = quote_lines(lines)
+        total = sum((line["total"] for line in results if "error" not in line), Decimal("0.00"))
+        return Response({"lines": results, "total": total}, status=status.HTTP_200_OK)
+
+
+class BulkOrderCreateView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        """
+        Create many orders in one transaction.
+
+        Body: {"orders": [<same fields as POST /v3/orders>, ...]}. Valid items are inserted
+        with a single bulk_create; invalid ones are reported by index and skipped.
+        """
+        items = request.data.get("orders") if isinstance(request.data, dict) else request.data
+        if not isinstance(items, list) or not items:
+            return Response({"error": "orders must be a non-empty list."}, status=status.HTTP_400_BAD_REQUEST)
+        max_items = getattr(settings, "BULK_ORDER_MAX_ITEMS", 1000)
+        if len(items) > max_items:
+            return Response({"error": f"At most {max_items} orders can be submitted at once."}, status=status.HTTP_400_BAD_REQUEST)
+        if not all(isinstance(item, dict) for item in items):
+            return Response({"error": "Each order must be an object."}, status=status.HTTP_400_BAD_REQUEST)
+
+        product_ids = set()
+        for item in items:
+            try:
+                product_ids.add(int(item.get("product_id")))
+            except (TypeError, ValueError):
+                pass
+        products = Product.objects.in_bulk(product_ids)
+        quotes = quote_lines(items, products=products)
+
+        results = []
+        orders = []
+        for index, (item, price) in enumerate(zip(items, quotes)):
+            if "error" in price:
+                results.append({"index": index, "status": "error", "error": price["error"]})
+                continue
+            if not item.get("shipping_address") or not item.get("billing_address"):
+                results.append({"index": index, "status": "error", "error": "Shipping and billing addresses are required."})
+                continue
+            orders.append(Order(
+                user=request.user,
+                product=products[price["product_id"]],
+                quantity=price["quantity"],
+                options=item.get("options", {}),
+                shipping_address=item["shipping_address"],
+                billing_address=item["billing_address"],
+                files=item.get("files", []),
+                total_amount=price["total"],
+            ))
+            results.append({"index": index, "status": "created", "order": orders[-1]})
+
+        try:
+            with transaction.atomic():
+                Order.objects.bulk_create(orders, batch_size=500)
+                # bulk_create sends no post_save, so feed the rollups directly
+                record_orders(orders)
+        except Exception as e:
+            return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+        for result in results:
+            order = result.pop("order", None)
+            if order is not None:
+                result.update({"id": order.id, "total_amount": order.total_amount})
+
+        if not orders:
+            response_status = status.HTTP_400_BAD_REQUEST
+        elif len(orders) < len(items):
+            response_status = status.HTTP_207_MULTI_STATUS
+        else:
+            response_status = status.HTTP_201_CREATED
+        return Response({"created": len(orders), "failed": len(items) - len(orders), "results": results}, status=response_status)
+
+
+class OrderExportView(ReplicaReadMixin, APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        """
+        Stream the order history as NDJSON (default) or CSV.
+
+        Query params: output=ndjson|csv, from=YYYY-MM-DD, to=YYYY-MM-DD, status=<status>
+        """
+        if not request.user.is_authorized:
+            return Response({"error": "You are not authorized to export orders."}, status=status.HTTP_403_FORBIDDEN)
+
+        output = request.query_params.get("output", "ndjson")
+        if output not in ("ndjson", "csv"):
+            return Response({"error": "output must be ndjson or csv."}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            orders = export_queryset(
+                request.query_params.get("from"),
+                request.query_params.get("to"),
+                request.query_params.get("status"),
+            )
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        # The body is streamed after dispatch returns, so bind the routing decision now
+        orders = orders.using(router.db_for_read(Order))
+
+        if output == "csv":
+            response = StreamingHttpResponse(iter_csv(orders), content_type="text/csv")
+        else:
+            response = StreamingHttpResponse(iter_ndjson(orders), content_type="application/x-ndjson")
+        response["Content-Disposition"] = f'attachment; filename="orders.{output}"'
+        return response
+
+
+class SalesReportView(ReplicaReadMixin, APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        """
+        Daily revenue from the rollup tables.
+
+        Query params: group=product|category|status (default product), from=YYYY-MM-DD,
+        to=YYYY-MM-DD (default: the last 30 days, at most 366 days)
+        """
+        if not request.user.is_authorized:
+            return Response({"error": "You are not authorized to view sales reports."}, status=status.HTTP_403_FORBIDDEN)
+
+        try:
+            days = {}
+            for param in ("from", "to"):
+                value = request.query_params.get(param)
+                days[param] = parse_date(value) if value else None
+                if value and days[param] is None:
+                    raise ValueError(f"Invalid date: {value}. Use YYYY-MM-DD.")
+            date_to = days["to"] or timezone.localdate()
+            date_from = days["from"] or date_to - timedelta(days=29)
+            if date_from > date_to or (date_to - date_from).days > 365:
+                raise ValueError("from must not be after to, and the range is limited to 366 days.")
+            report = sales_report(request.query_params.get("group", "product"), date_from, date_to)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(report, status=status.HTTP_200_OK)
+
+
+def _order_for_upload(request, order_id):
+    """The order, or None when the user may not attach files to it (not theirs and not an admin)."""
+    order = get_object_or_404(Order, id=order_id)
+    if not (request.user.is_authorized or order.user_id == request.user.id):
+        return None
+    return order
+
+
+class OrderFilePresignView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, order_id):
+        """
+        Start a direct-to-storage upload of a design file.
+
+        Body: {"filename", "content_type"} -> presigned POST url/fields and the object key
+        """
+        order = _order_for_upload(request, order_id)
+        if order is None:
+            return Response({"error": "This is not your order. Please enter your order ID."}, status=status.HTTP_403_FORBIDDEN)
+        try:
+            upload = presign_upload(order, request.data.get("filename"), request.data.get("content_type"))
+        except UploadError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(upload, status=status.HTTP_201_CREATED)
+
+
+class OrderFileCompleteView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, order_id):
+        """
+        Record a finished upload in the order's files list.
+
+        Body: {"key"} as returned by the presign endpoint
+        """
+        order = _order_for_upload(request, order_id)
+        if order is None:
+            return Response({"error": "This is not your order. Please enter your order ID."}, status=status.HTTP_403_FORBIDDEN)
+        try:
+            order = complete_upload(order, request.data.get("key"))
+        except UploadError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({"files": order.files}, status=status.HTTP_200_OK)
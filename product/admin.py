@@ -8,4 +8,6 @@ admin.site.register(Size)
 admin.site.register(Product)
 admin.site.register(Category)
 admin.site.register(Subcategory)
-admin.site.register(ProductImage)
\ No newline at end of file
+admin.site.register(ProductImage)
+admin.site.register(ThumbnailJob)
+admin.site.register(ProductOptionFacet)
\ No newline at end of file
@@ -0,0 +1,89 @@
+from asgiref.sync import sync_to_async
+from django.http import Http404, JsonResponse
+from django.views import View
+from rest_framework import exceptions
+from rest_framework.authentication import SessionAuthentication
+from rest_framework.settings import api_settings
+
+from my_project.routers import use_replica
+
+from .cache import CATALOG_VERSION_KEY, aget_category_tree, aget_version, subcategories_from_tree
+from .conditional import not_modified_response, set_validators
+from .models import Product
+from .serializers import ProductSerializer
+from .views import product_etag
+
+
+async def authenticate(request):
+    """
+    Async counterpart of DRF's authentication step.
+
+    Token authenticators from DEFAULT_AUTHENTICATION_CLASSES run in a worker thread (they may
+    touch the database); DRF's SessionAuthentication needs a DRF Request, so sessions are
+    resolved with request.auser() instead.
+    """
+    for authenticator_class in api_settings.DEFAULT_AUTHENTICATION_CLASSES:
+        if issubclass(authenticator_class, SessionAuthentication):
+            continue
+        result = await sync_to_async(authenticator_class().authenticate)(request)
+        if result is not None:
+            return result[0]
+    return await request.auser()
+
+
+class AsyncCatalogView(View):
+    """Base class for native async catalog endpoints; requires an authenticated user."""
+
+    async def dispatch(self, request, *args, **kwargs):
+        try:
+            user = await authenticate(request)
+        except exceptions.APIException as e:
+            return JsonResponse({"detail": str(e.detail)}, status=e.status_code)
+        if not user or not user.is_authenticated:
+            return JsonResponse({"detail": "Authentication credentials were not provided."}, status=401)
+        request.user = user
+        try:
+            with use_replica():
+                return await super().dispatch(request, *args, **kwargs)
+        except Http404 as e:
+            return JsonResponse({"detail": str(e)}, status=404)
+
+
+class AsyncCategoryListView(AsyncCatalogView):
+    async def get(self, request):
+        tree = await aget_category_tree()
+        return JsonResponse(tree["categories"], safe=False)
+
+
+class AsyncSubcategoryByCategoryView(AsyncCatalogView):
+    async def get(self, request, category_id):
+        tree = await aget_category_tree()
+        return JsonResponse(subcategories_from_tree(tree, category_id), safe=False)
+
+
+class AsyncProductView(AsyncCatalogView):
+    async def get(self, request):
+        etag = f"products-{await aget_version(CATALOG_VERSION_KEY)}"
+        not_modified = not_modified_response(request, etag)
+        if not_modified is not None:
+            return not_modified
+
+        products = [product async for product in Product.objects.with_related()]
+        data = ProductSerializer(products, many=True).data
+        return set_validators(JsonResponse(data, safe=False), etag)
+
+
+class AsyncProductDetailView(AsyncCatalogView):
+    async def get(self, request, product_id):
+        try:
+            updated_at = await Product.objects.values_list("updated_at", flat=True).aget(id=product_id)
+        except Product.DoesNotExist:
+            return JsonResponse({"error": "Product not found"}, status=404)
+
+        not_modified = not_modified_response(request, product_etag(product_id, updated_at), updated_at)
+        if not_modified is not None:
+            return not_modified
+
+        product = await Product.objects.with_related().aget(id=product_id)
+        etag = product_etag(product.id, product.updated_at)
+        return set_validators(JsonResponse(ProductSerializer(product).data), etag, product.updated_at)
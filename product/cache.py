@@ -0,0 +1,178 @@
+import hashlib
+import time
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.http import Http404
+
+from my_project.routers import use_primary
+
+CATEGORY_TREE_VERSION_KEY = "catalog:category-tree:version"
+CATALOG_VERSION_KEY = "catalog:products:version"
+
+
+def get_version(key):
+    """Return the current value of a version counter, creating it when missing."""
+    version = cache.get(key)
+    if version is None:
+        # Start from a timestamp so an evicted counter never reuses an old version
+        cache.add(key, int(time.time() * 1000), None)
+        version = cache.get(key)
+    return version
+
+
+def bump_version(key):
+    """Invalidate everything cached under the previous version of ``key``."""
+    try:
+        return cache.incr(key)
+    except ValueError:
+        version = int(time.time() * 1000)
+        cache.set(key, version, None)
+        return version
+
+
+def bump_version_on_commit(key):
+    """
+    Bump ``key`` once the current transaction commits (immediately outside one).
+
+    Bumping earlier lets a concurrent request rebuild the entry from the rows as they
+    were before the write and cache them under the new version.
+    """
+    transaction.on_commit(lambda: bump_version(key))
+
+
+def serialize_category_tree(categories):
+    """Serialize every category once, with its subcategories grouped by category id."""
+    from .serializers import CategorySerializer, SubcategoryTreeSerializer
+
+    tree = {"categories": [], "subcategories": {}}
+    for category in categories:
+        tree["categories"].append(dict(CategorySerializer(category).data))
+        tree["subcategories"][category.id] = [
+            dict(row) for row in SubcategoryTreeSerializer(category.subcategories.all(), many=True).data
+        ]
+    return tree
+
+
+def _category_tree_queryset():
+    from .models import Category
+
+    return Category.objects.order_by("id").prefetch_related("subcategories")
+
+
+def build_category_tree():
+    return serialize_category_tree(_category_tree_queryset())
+
+
+def _category_tree_key(version):
+    return f"catalog:category-tree:{version}"
+
+
+def get_category_tree():
+    key = _category_tree_key(get_version(CATEGORY_TREE_VERSION_KEY))
+    tree = cache.get(key)
+    if tree is None:
+        with use_primary():
+            tree = build_category_tree()
+        cache.set(key, tree, getattr(settings, "CATALOG_CACHE_TIMEOUT", 60 * 60 * 24))
+    return tree
+
+
+async def aget_version(key):
+    version = await cache.aget(key)
+    if version is None:
+        await cache.aadd(key, int(time.time() * 1000), None)
+        version = await cache.aget(key)
+    return version
+
+
+async def aget_category_tree():
+    """Async twin of get_category_tree() using the async cache and ORM APIs."""
+    key = _category_tree_key(await aget_version(CATEGORY_TREE_VERSION_KEY))
+    tree = await cache.aget(key)
+    if tree is None:
+        with use_primary():
+            tree = serialize_category_tree([category async for category in _category_tree_queryset()])
+        await cache.aset(key, tree, getattr(settings, "CATALOG_CACHE_TIMEOUT", 60 * 60 * 24))
+    return tree
+
+
+def get_cached_categories():
+    return get_category_tree()["categories"]
+
+
+def get_cached_subcategories(category_id):
+    return subcategories_from_tree(get_category_tree(), category_id)
+
+
+def subcategories_from_tree(tree, category_id):
+    """Subcategories of a category, each carrying the (shared) parent category payload."""
+    if category_id not in tree["subcategories"]:
+        raise Http404("No Category matches the given query.")
+    parent = next(category for category in tree["categories"] if category["id"] == category_id)
+    return [{**subcategory, "parent_category": parent} for subcategory in tree["subcategories"][category_id]]
+
+
+def catalog_response_key(name, params, latest=False):
+    """
+    Cache key of one product-listing variant (filters, page, field set) under the current
+    catalog version, or with ``latest`` under no version (see get_or_build's ``stale_key``).
+    """
+    digest = hashlib.sha1(urlencode(sorted(params.items())).encode()).hexdigest()[:20]
+    version = "latest" if latest else get_version(CATALOG_VERSION_KEY)
+    return f"catalog:response:{name}:{version}:{digest}"
+
+
+def get_or_build(key, build, stale_key=None):
+    """
+    Cached ``build()`` result with single-flight recomputation; returns (payload, current).
+
+    Entries are served for CATALOG_RESPONSE_FRESH_FOR seconds and kept for
+    CATALOG_CACHE_TIMEOUT. Whoever wins the ``cache.add`` lock refreshes an expired entry
+    while everyone else keeps serving it. A version bump turns every entry into a miss,
+    so each build is also stored under ``stale_key`` (a version-independent key), and
+    while one caller builds the new version the others serve that payload with
+    ``current`` False: it may predate the change, so it must not carry the new
+    version's validators. Without one, they wait up to CATALOG_RESPONSE_LOCK_WAIT
+    seconds for the builder and then build the payload themselves, uncached.
+    """
+    lock_key = f"{key}:lock"
+    lock_timeout = getattr(settings, "CATALOG_RESPONSE_LOCK_TIMEOUT", 30)
+    entry = cache.get(key)
+    if entry is not None:
+        refresh_at, payload = entry
+        if time.time() < refresh_at or not cache.add(lock_key, 1, lock_timeout):
+            return payload, True
+        return _rebuild(key, lock_key, build, stale_key), True
+
+    if cache.add(lock_key, 1, lock_timeout):
+        return _rebuild(key, lock_key, build, stale_key), True
+    if stale_key is not None:
+        stale = cache.get(stale_key)
+        if stale is not None:
+            return stale, False
+    deadline = time.monotonic() + getattr(settings, "CATALOG_RESPONSE_LOCK_WAIT", 0.5)
+    while time.monotonic() < deadline:
+        time.sleep(0.05)
+        entry = cache.get(key)
+        if entry is not None:
+            return entry[1], True
+    # Don't tie up the worker any longer; the lock holder will store the entry
+    with use_primary():
+        return build(), True
+
+
+def _rebuild(key, lock_key, build, stale_key=None):
+    try:
+        with use_primary():
+            payload = build()
+        fresh_for = getattr(settings, "CATALOG_RESPONSE_FRESH_FOR", 5 * 60)
+        timeout = getattr(settings, "CATALOG_CACHE_TIMEOUT", 60 * 60 * 24)
+        cache.set(key, (time.time() + fresh_for, payload), timeout)
+        if stale_key is not None:
+            cache.set(stale_key, payload, timeout)
+        return payload
+    finally:
+        cache.delete(lock_key)
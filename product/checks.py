@@ -0,0 +1,16 @@
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+
+
+@register(Tags.caches)
+def shared_cache_check(app_configs, **kwargs):
+    """Catalog invalidation bumps version keys in the cache, which only works if every worker shares it."""
+    if settings.DEBUG or not settings.CACHES["default"]["BACKEND"].endswith("LocMemCache"):
+        return []
+    return [
+        Warning(
+            "The default cache is per-process (LocMemCache), so catalog changes only invalidate the worker that made them.",
+            hint="Set CACHE_LOCATION to a Redis URL (or CACHE_BACKEND/CACHE_LOCATION to another shared backend).",
+            id="product.W001",
+        )
+    ]
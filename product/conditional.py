@@ -0,0 +1,20 @@
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+
+def _timestamp(last_modified):
+    return int(last_modified.timestamp()) if last_modified else None
+
+
+def not_modified_response(request, etag, last_modified=None):
+    """Return a 304 when the client's If-None-Match/If-Modified-Since still match, else None."""
+    return get_conditional_response(request, etag=quote_etag(etag), last_modified=_timestamp(last_modified))
+
+
+def set_validators(response, etag, last_modified=None):
+    response["ETag"] = quote_etag(etag)
+    if last_modified:
+        response["Last-Modified"] = http_date(_timestamp(last_modified))
+    # Responses depend on the logged-in user's access, so only the client may reuse them
+    response["Cache-Control"] = "private, no-cache"
+    return response
@@ -0,0 +1,149 @@
+import json
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import Q
+
+from my_project.db import upsert
+
+from .cache import CATALOG_VERSION_KEY, bump_version_on_commit
+from .models import ProductOptionFacet
+
+# Column sizes of ProductOptionFacet; longer keys and values are rejected by ProductSerializer
+MAX_KEY_LENGTH = 100
+MAX_VALUE_LENGTH = 255
+
+
+def _parse_legacy(options):
+    """The dict a legacy JSON-string ``options`` value encodes, or None when it encodes something else."""
+    try:
+        options = json.loads(options)
+    except json.JSONDecodeError:
+        return None
+    return options if isinstance(options, dict) else None
+
+
+def _facet_value(value):
+    return value if isinstance(value, str) else json.dumps(value)
+
+
+def option_pairs(options):
+    """(key, value) pairs a product contributes to the facets; list values count once per element."""
+    pairs = set()
+    # Legacy rows holding a JSON string never match the @> filter, so they don't count
+    # until rebuild_facets() rewrites them as objects
+    if not isinstance(options, dict):
+        return pairs
+    for key, value in options.items():
+        # A truncated key or value would be counted but never match filter_by_options()
+        if len(key) > MAX_KEY_LENGTH:
+            continue
+        values = value if isinstance(value, list) else [value]
+        for item in values:
+            if item is None or isinstance(item, (dict, list)) or item == "":
+                continue
+            text = _facet_value(item)
+            if len(text) <= MAX_VALUE_LENGTH:
+                pairs.add((key, text))
+    return pairs
+
+
+def check_option_lengths(options):
+    """Raise ValueError for option keys or values too long to be counted as facets."""
+    if not isinstance(options, dict):
+        return
+    for key, value in options.items():
+        if len(key) > MAX_KEY_LENGTH:
+            raise ValueError(f"Option names are limited to {MAX_KEY_LENGTH} characters.")
+        for item in value if isinstance(value, list) else [value]:
+            if isinstance(item, str) and len(item) > MAX_VALUE_LENGTH:
+                raise ValueError(f"Option values are limited to {MAX_VALUE_LENGTH} characters.")
+
+
+def apply_delta(old_pairs, new_pairs):
+    """Move facet counts from a product's old option pairs to its new ones."""
+    delta = Counter({pair: 1 for pair in new_pairs - old_pairs})
+    delta.subtract({pair: 1 for pair in old_pairs - new_pairs})
+    if not delta:
+        return
+    rows = [{"key": key, "value": value, "count": count} for (key, value), count in delta.items()]
+    with transaction.atomic():
+        upsert(ProductOptionFacet, rows, conflict_fields=["key", "value"], update_fields=["count"], increment=True)
+        removed = Q()
+        for key, value in old_pairs - new_pairs:
+            removed |= Q(key=key, value=value)
+        if removed:
+            ProductOptionFacet.objects.filter(removed, count__lte=0).delete()
+
+
+def rebuild_facets():
+    """
+    Recount every facet from scratch (use after bulk imports that bypass signals).
+
+    Legacy rows whose options were stored as a JSON string are rewritten as JSON objects
+    first, so the filter can match them too.
+    """
+    from .models import Product
+
+    counts = Counter()
+    legacy = []
+    for pk, options in Product.objects.values_list("pk", "options").iterator(chunk_size=2000):
+        if isinstance(options, str) and (parsed := _parse_legacy(options)) is not None:
+            legacy.append(Product(pk=pk, options=parsed))
+            options = parsed
+        counts.update(option_pairs(options))
+    with transaction.atomic():
+        if legacy:
+            Product.objects.bulk_update(legacy, ["options"], batch_size=2000)
+            bump_version_on_commit(CATALOG_VERSION_KEY)
+        ProductOptionFacet.objects.all().delete()
+        ProductOptionFacet.objects.bulk_create(
+            (ProductOptionFacet(key=key, value=value, count=count) for (key, value), count in counts.items()),
+            batch_size=2000,
+        )
+    return len(counts)
+
+
+def get_facets():
+    """{key: [{"value", "count"}, ...]} with the most common values first."""
+    facets = {}
+    for key, value, count in ProductOptionFacet.objects.filter(count__gt=0).order_by("key", "-count", "value").values_list("key", "value", "count"):
+        facets.setdefault(key, []).append({"value": value, "count": count})
+    return facets
+
+
+def _candidates(value):
+    # Query strings are text; also match the JSON scalar they spell (numbers, booleans)
+    candidates = [value]
+    try:
+        parsed = json.loads(value)
+    except json.JSONDecodeError:
+        return candidates
+    if isinstance(parsed, (int, float, bool)):
+        candidates.append(parsed)
+    return candidates
+
+
+def filter_by_options(queryset, selections):
+    """
+    Products whose options match every key in ``selections`` ({key: [values]}), any of the
+    values per key. Uses @> containment, served by the jsonb_path_ops GIN index.
+    """
+    for key, values in selections.items():
+        matches = Q()
+        for value in values:
+            for candidate in _candidates(value):
+                matches |= Q(options__contains={key: candidate}) | Q(options__contains={key: [candidate]})
+        queryset = queryset.filter(matches)
+    return queryset
+
+
+def parse_selections(params):
+    """Read repeated ``option=key:value`` query parameters into {key: [values]}."""
+    selections = {}
+    for raw in params:
+        key, sep, value = raw.partition(":")
+        if not sep or not key:
+            raise ValueError(f"Invalid option filter: {raw}. Use option=key:value.")
+        selections.setdefault(key, []).append(value)
+    return selections
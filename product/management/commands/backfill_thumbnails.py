@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from product.thumbnails import THUMBNAIL_MODELS, enqueue_missing
+
+
+class Command(BaseCommand):
+    help = "Queue thumbnail jobs for existing images that have no thumbnail yet."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--model", choices=THUMBNAIL_MODELS, action="append", dest="models")
+        parser.add_argument("--regenerate", action="store_true", help="Queue every image, not only missing thumbnails")
+
+    def handle(self, *args, **options):
+        for model_name in options["models"] or THUMBNAIL_MODELS:
+            queued = enqueue_missing(model_name, regenerate=options["regenerate"])
+            self.stdout.write(f"{model_name}: queued {queued} jobs")
+        self.stdout.write(self.style.SUCCESS("Run `manage.py process_thumbnails` to generate them"))
@@ -0,0 +1,57 @@
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from my_project.bench import summarize
+
+DEFAULT_PATHS = [
+    "/v2/category", "/v2/async/category",
+    "/v2/products", "/v2/async/products",
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Load-test catalog endpoints on a running server and report requests/sec and latency. "
+        "Run it against `gunicorn my_project.wsgi` and `uvicorn my_project.asgi:application` "
+        "(or compare the /v2/... and /v2/async/... paths on one ASGI server)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+        parser.add_argument("--token", required=True, help="JWT access token sent as a Bearer header")
+        parser.add_argument("--path", action="append", dest="paths", help="Path to hit (repeatable)")
+        parser.add_argument("--requests", type=int, default=500, help="Requests per path")
+        parser.add_argument("--concurrency", type=int, default=16)
+
+    def handle(self, *args, **options):
+        headers = {"Authorization": f"Bearer {options['token']}"}
+        for path in options["paths"] or DEFAULT_PATHS:
+            url = options["base_url"].rstrip("/") + path
+            latencies, errors, elapsed = self.run_path(url, headers, options["requests"], options["concurrency"])
+            stats = summarize(latencies)
+            self.stdout.write(
+                f"{path:<32} {len(latencies) / elapsed:>9.1f} req/s  "
+                f"p50 {stats['p50_ms']:>8.2f} ms  p99 {stats['p99_ms']:>8.2f} ms  errors {errors}"
+            )
+
+    def run_path(self, url, headers, total, concurrency):
+        def fetch(_):
+            request = urllib.request.Request(url, headers=headers)
+            started = time.perf_counter()
+            try:
+                with urllib.request.urlopen(request) as response:
+                    response.read()
+            except (urllib.error.URLError, ConnectionError):
+                return None
+            return time.perf_counter() - started
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            results = list(pool.map(fetch, range(total)))
+        elapsed = time.perf_counter() - started
+        latencies = [latency for latency in results if latency is not None]
+        return latencies, total - len(latencies), elapsed
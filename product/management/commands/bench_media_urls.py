@@ -0,0 +1,38 @@
+import time
+
+from django.core.management.base import BaseCommand
+from storages.backends.s3boto3 import S3Boto3Storage
+
+from product.media import cached_url, clear_url_cache
+
+
+class Command(BaseCommand):
+    help = "Measure CPU spent generating media URLs per 1000 images, with and without the URL cache."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--images", type=int, default=1000)
+        parser.add_argument("--listings", type=int, default=20, help="How many times the same listing is rendered")
+        parser.add_argument(
+            "--signed", action="store_true",
+            help="Benchmark presigned URLs (no custom domain) instead of the configured storage",
+        )
+
+    def handle(self, *args, **options):
+        # URL building and signing are pure CPU; no request reaches S3
+        storage = S3Boto3Storage(custom_domain=None, querystring_auth=True) if options["signed"] else S3Boto3Storage()
+        names = [f"products/images/bench-{i}.jpg" for i in range(options["images"])]
+        listings = options["listings"]
+
+        uncached = self.cpu_per_1000(lambda: [storage.url(name) for name in names], listings, len(names))
+        clear_url_cache()
+        cached = self.cpu_per_1000(lambda: [cached_url(storage, name) for name in names], listings, len(names))
+
+        self.stdout.write(f"storage.url():  {uncached:8.2f} ms CPU per 1000 images")
+        self.stdout.write(f"cached_url():   {cached:8.2f} ms CPU per 1000 images (first listing included)")
+        self.stdout.write(self.style.SUCCESS(f"saved {uncached - cached:.2f} ms CPU per 1000 images"))
+
+    def cpu_per_1000(self, render, listings, image_count):
+        started = time.process_time()
+        for _ in range(listings):
+            render()
+        return (time.process_time() - started) * 1000 / listings / image_count * 1000
@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from product.thumbnails import process_jobs
+
+
+class Command(BaseCommand):
+    help = "Generate queued WebP thumbnails. Run several copies to process jobs in parallel."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=50)
+        parser.add_argument("--loop", action="store_true", help="Keep polling for new jobs")
+        parser.add_argument("--sleep", type=float, default=2.0, help="Seconds to wait when the queue is empty")
+
+    def handle(self, *args, **options):
+        total = 0
+        while True:
+            processed = process_jobs(options["batch_size"])
+            total += processed
+            if processed:
+                continue
+            if not options["loop"]:
+                break
+            time.sleep(options["sleep"])
+        self.stdout.write(self.style.SUCCESS(f"Processed {total} thumbnail jobs"))
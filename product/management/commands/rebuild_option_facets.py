@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+
+from product.facets import rebuild_facets
+
+
+class Command(BaseCommand):
+    help = "Recount the product option facets from scratch."
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {rebuild_facets()} option facets"))
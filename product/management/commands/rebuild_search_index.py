@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from product.models import Product
+from product.search import refresh_search_vectors
+
+
+class Command(BaseCommand):
+    help = "Recompute Product.search_vector for every product, in primary-key batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=5000)
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        last_id, updated = 0, 0
+        while True:
+            ids = list(Product.objects.filter(id__gt=last_id).order_by("id").values_list("id", flat=True)[:batch_size])
+            if not ids:
+                break
+            updated += refresh_search_vectors(Product.objects.filter(id__gte=ids[0], id__lte=ids[-1]))
+            last_id = ids[-1]
+        self.stdout.write(self.style.SUCCESS(f"Indexed {updated} products"))
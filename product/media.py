@@ -0,0 +1,64 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from rest_framework import serializers
+
+_lock = threading.Lock()
+_urls = OrderedDict()
+
+
+def _storage_key(storage):
+    cls = type(storage)
+    return (
+        f"{cls.__module__}.{cls.__qualname__}",
+        getattr(storage, "bucket_name", None),
+        getattr(storage, "custom_domain", None),
+        getattr(storage, "location", None),
+    )
+
+
+def _window_seconds(storage):
+    # Signed URLs are reused for at most half their lifetime so clients always get a valid one
+    if getattr(storage, "querystring_auth", False):
+        return max(1, getattr(storage, "querystring_expire", 3600) // 2)
+    return getattr(settings, "MEDIA_URL_CACHE_WINDOW", 60 * 60)
+
+
+def cached_url(storage, name):
+    """storage.url(name), memoized per (storage, name, expiry window) in this process."""
+    key = (_storage_key(storage), name, int(time.time() // _window_seconds(storage)))
+    with _lock:
+        url = _urls.get(key)
+        if url is not None:
+            _urls.move_to_end(key)
+            return url
+    url = storage.url(name)
+    with _lock:
+        _urls[key] = url
+        if len(_urls) > getattr(settings, "MEDIA_URL_CACHE_SIZE", 10000):
+            _urls.popitem(last=False)
+    return url
+
+
+def media_url(field_file):
+    return cached_url(field_file.storage, field_file.name) if field_file else None
+
+
+def clear_url_cache():
+    with _lock:
+        _urls.clear()
+
+
+class MediaURLField(serializers.ImageField):
+    """ImageField whose output URL goes through the memoized cached_url()."""
+
+    def to_representation(self, value):
+        url = media_url(value)
+        if url is None:
+            return None
+        request = self.context.get("request", None)
+        if request is not None:
+            return request.build_absolute_uri(url)
+        return url
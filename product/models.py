@@ -1,15 +1,22 @@
 from decimal import Decimal
 import json
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Sum, Value
+from django.db.models.functions import Cast, Coalesce, Round
 from django.forms import JSONField
+from django.utils import timezone
 from my_app.models import CustomUser
 import uuid
 
+LINE_TOTAL_FIELD = DecimalField(max_digits=20, decimal_places=4)
+
 
 class Category(models.Model):
     name = models.CharField(max_length=255, unique=True)
     image = models.ImageField(upload_to='categories/')
-    thumbnail = models.ImageField(upload_to='categories/thumbnails/')
+    thumbnail = models.ImageField(upload_to='categories/thumbnails/', blank=True)
 
     def __str__(self):
         return self.name
@@ -19,7 +26,7 @@ class Subcategory(models.Model):
     name = models.CharField(max_length=255, unique=True)
     parent_category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name="subcategories")
     image = models.ImageField(upload_to='subcategories/')
-    thumbnail = models.ImageField(upload_to='subcategories/thumbnails/')
+    thumbnail = models.ImageField(upload_to='subcategories/thumbnails/', blank=True)
 
     def __str__(self):
         return f"{self.name} - {self.parent_category.name}"
@@ -39,6 +46,12 @@ class Printing(models.Model):
     def __str__(self):
         return self.quality
 
+class ProductQuerySet(models.QuerySet):
+    def with_related(self):
+        """Load category and images in batches so serializing a page costs a fixed number of queries."""
+        return self.select_related("category").prefetch_related("images").defer("search_vector")
+
+
 class Product(models.Model):
     id = models.AutoField(primary_key=True)
     name = models.CharField(max_length=255)
@@ -53,22 +66,49 @@ class Product(models.Model):
     additional_design_charge = models.DecimalField(max_digits=10, decimal_places=2, default=0.0, help_text="Additional charge for custom design")
     image_description = models.TextField(blank=True, null=True, help_text="Description for images related to this product")
     delivery_charges = models.DecimalField(max_digits=10, decimal_places=2, default=0.0, help_text="Delivery charges for this product")
+    updated_at = models.DateTimeField(auto_now=True, help_text="Last change to the product or its images")
+    search_vector = SearchVectorField(null=True, editable=False, help_text="Maintained by product.search")
+
+    objects = ProductQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            GinIndex(fields=["search_vector"], name="product_search_vector_gin"),
+            GinIndex(fields=["options"], opclasses=["jsonb_path_ops"], name="product_options_path_gin"),
+        ]
 
     def set_options(self, options_dict):
-        """ Save dictionary as JSON string """
-        self.options = json.dumps(options_dict)
+        """ Store the dictionary as-is; JSONField keeps it as jsonb """
+        self.options = options_dict
 
     def get_options(self):
-        """ Convert stored JSON string back to dictionary """
-        try:
-            return json.loads(self.options)
-        except (json.JSONDecodeError, TypeError):
-            return {}
+        """ Options as a dictionary (older rows may hold a JSON-encoded string) """
+        if isinstance(self.options, str):
+            try:
+                return json.loads(self.options)
+            except json.JSONDecodeError:
+                return {}
+        return self.options or {}
 
 
     def __str__(self):
         return self.name
 
+class ProductOptionFacet(models.Model):
+    """How many products carry each option key/value, kept up to date by product.facets."""
+    key = models.CharField(max_length=100)
+    value = models.CharField(max_length=255)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["key", "value"], name="productoptionfacet_key_value_unique"),
+        ]
+
+    def __str__(self):
+        return f"{self.key}={self.value} ({self.count})"
+
+
 class Order(models.Model):
     user = models.ForeignKey(CustomUser, on_delete=models.CASCADE)
     product = models.ForeignKey(Product, on_delete=models.CASCADE)
@@ -79,8 +119,9 @@ class Order(models.Model):
 
     @property
     def total_price(self):
-        """Calculate total price based on size, printing, and quantity."""
-        return (self.product.base_price * self.size.price_multiplier * self.printing.price_multiplier) * self.quantity
+        """Calculate total price based on quantity."""
+        from .pricing import line_subtotal
+        return line_subtotal(self.product, self.quantity)
 
     def __str__(self):
         return f"Order {self.id} by {self.user.username}"
@@ -89,11 +130,80 @@ class Order(models.Model):
 class ProductImage(models.Model):
     product = models.ForeignKey("Product", on_delete=models.CASCADE, related_name="images")
     image = models.ImageField(upload_to="products/images/")
-    thumbnail = models.ImageField(upload_to="products/thumbnails/")
+    thumbnail = models.ImageField(upload_to="products/thumbnails/", blank=True)
 
     def __str__(self):
         return f"Image for {self.product.name}"
 
+class CartQuerySet(models.QuerySet):
+    def _line_total(self):
+        # Same formula as pricing.line_subtotal(): missing size/printing multipliers count as 1
+        multiplier = (
+            Coalesce("size__price_multiplier", Value(Decimal("1")), output_field=LINE_TOTAL_FIELD)
+            * Coalesce("printing__price_multiplier", Value(Decimal("1")), output_field=LINE_TOTAL_FIELD)
+        )
+        return Round(
+            ExpressionWrapper(F("product__base_price") * multiplier * F("quantity"), output_field=LINE_TOTAL_FIELD),
+            2,
+        )
+
+    def with_totals(self):
+        """Cart lines with their related rows joined and ``line_total`` computed in SQL."""
+        return self.select_related("product", "size", "printing").annotate(line_total=self._line_total())
+
+    def summary(self):
+        """
+        Item count and the pricing.quote() components summed over the lines in this
+        queryset, in one query. Cart lines carry no customization options, so the total
+        is subtotal + design + delivery + VAT.
+        """
+        line_total = self._line_total()
+        vat_rate = Cast("product__vat_percent", LINE_TOTAL_FIELD) / Value(Decimal("100"))
+
+        def total_of(expression):
+            return Coalesce(Sum(expression), Value(Decimal("0.00")), output_field=LINE_TOTAL_FIELD)
+
+        totals = self.aggregate(
+            line_count=Count("id"),
+            item_count=Coalesce(Sum("quantity"), 0),
+            subtotal=total_of(line_total),
+            design=total_of(Round(
+                ExpressionWrapper(F("product__additional_design_charge") * F("quantity"), output_field=LINE_TOTAL_FIELD), 2,
+            )),
+            delivery=total_of(F("product__delivery_charges")),
+            vat=total_of(Round(ExpressionWrapper(line_total * vat_rate, output_field=LINE_TOTAL_FIELD), 2)),
+        )
+        totals["total"] = totals["subtotal"] + totals["design"] + totals["delivery"] + totals["vat"]
+        return totals
+
+    def upsert_lines(self, user, lines, mode="add"):
+        """
+        Add (``mode="add"``) or set (``mode="set"``) quantities for many
+        (product, size, printing) lines of ``user``'s cart in one INSERT ... ON CONFLICT.
+        Lines repeating the same key are merged first. Returns the ids of the touched rows.
+        """
+        from my_project.db import upsert
+
+        merged = {}
+        for line in lines:
+            key = (line["product_id"], line.get("size_id"), line.get("printing_id"))
+            if mode == "add" and key in merged:
+                merged[key] += line["quantity"]
+            else:
+                merged[key] = line["quantity"]
+        now = timezone.now()
+        rows = [
+            {"user": user.pk, "product": product_id, "size": size_id, "printing": printing_id,
+             "quantity": quantity, "added_at": now}
+            for (product_id, size_id, printing_id), quantity in merged.items()
+        ]
+        returned = upsert(
+            self.model, rows, conflict_fields=["user", "product", "size", "printing"],
+            update_fields=["quantity"], increment=(mode == "add"), returning=["id"],
+        )
+        return [row[0] for row in returned]
+
+
 class Cart(models.Model):
     user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name="cart")
     product = models.ForeignKey(Product, on_delete=models.CASCADE)
@@ -102,15 +212,48 @@ class Cart(models.Model):
     quantity = models.PositiveIntegerField(default=1)
     added_at = models.DateTimeField(auto_now_add=True)
 
+    objects = CartQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            # One row per line; NULL size/printing count as equal (PostgreSQL 15+)
+            models.UniqueConstraint(
+                fields=["user", "product", "size", "printing"], nulls_distinct=False, name="cart_unique_line"
+            ),
+        ]
+
     @property
     def total_price(self):
-        """Ensure multiplication works properly."""
-        breakpoint()
-        if self.product and self.size and self.printing:
-            return (self.product.base_price) * Decimal(self.size.price_multiplier) * Decimal(self.printing.price_multiplier) * self.quantity
+        """Calculate line price based on size, printing, and quantity."""
+        if getattr(self, "line_total", None) is not None:
+            return self.line_total  # Computed by CartQuerySet.with_totals()
+        from .pricing import line_subtotal
+        return line_subtotal(self.product, self.quantity, self.size, self.printing)
 
     def __str__(self):
         return f"{self.quantity} x {self.product.name} - {self.user.username}"
 
 
+class ThumbnailJob(models.Model):
+    """Pending thumbnail work, consumed by `manage.py process_thumbnails` outside the request cycle."""
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+
+    model = models.CharField(max_length=50, help_text="Lower-case model name, e.g. productimage")
+    object_id = models.PositiveBigIntegerField()
+    status = models.CharField(max_length=20, default=PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "id"], name="thumbnailjob_status_id_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.model} {self.object_id} ({self.status})"
 
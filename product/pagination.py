@@ -1,6 +1,14 @@
 from rest_framework.pagination import PageNumberPagination
 
+from my_project.pagination import KeysetPagination
+
+
 class ProductPagination(PageNumberPagination):
     page_size = 2  # Number of orders per page
     page_size_query_param = 'page_size'
     max_page_size = 20
+
+
+class ProductCursorPagination(KeysetPagination):
+    page_size = 2
+    ordering = "id"
@@ -0,0 +1,158 @@
+"""
+Single source of truth for order and cart price math.
+
+Every line is priced the same way:
+
+    base          = base_price * size multiplier * printing multiplier * quantity
+    design        = additional_design_charge * quantity
+    vat           = vat_percent% of base
+    delivery      = delivery_charges (once per line)
+    customization = CUSTOMIZATION_CHARGE per option the customer filled in
+"""
+from decimal import Decimal, ROUND_HALF_UP
+
+CENTS = Decimal("0.01")
+CUSTOMIZATION_CHARGE = Decimal("1.00")  # Charge per filled-in customization option
+
+
+class PricingError(ValueError):
+    pass
+
+
+def to_decimal(value):
+    if isinstance(value, Decimal):
+        return value
+    return Decimal(str(value))
+
+
+def validate_quantity(product, quantity):
+    if quantity < product.minimum_qty or quantity % product.qty_step_count != 0:
+        raise PricingError("Invalid quantity. Must be at least minimum quantity and in multiples of step count.")
+
+
+def count_customizations(options):
+    """Options arrive either as a dict or as a list of {"name", "value"} entries."""
+    if not options:
+        return 0
+    if isinstance(options, dict):
+        values = options.values()
+    else:
+        values = [option.get("value") if isinstance(option, dict) else option for option in options]
+    return sum(1 for value in values if value)
+
+
+def price_multiplier(size=None, printing=None):
+    multiplier = Decimal("1")
+    if size is not None:
+        multiplier *= to_decimal(size.price_multiplier)
+    if printing is not None:
+        multiplier *= to_decimal(printing.price_multiplier)
+    return multiplier
+
+
+def line_subtotal(product, quantity, size=None, printing=None):
+    """Base charge of a line, before design, delivery, VAT and customization."""
+    return (product.base_price * price_multiplier(size, printing) * quantity).quantize(CENTS, ROUND_HALF_UP)
+
+
+def quote(product, quantity, size=None, printing=None, options=None):
+    """Full breakdown for one line; every component is rounded to cents and total is their sum."""
+    base = line_subtotal(product, quantity, size, printing)
+    design = (product.additional_design_charge * quantity).quantize(CENTS, ROUND_HALF_UP)
+    delivery = to_decimal(product.delivery_charges).quantize(CENTS, ROUND_HALF_UP)
+    vat = (to_decimal(product.vat_percent) / Decimal("100") * base).quantize(CENTS, ROUND_HALF_UP)
+    customization = CUSTOMIZATION_CHARGE * count_customizations(options)
+    return {
+        "base": base,
+        "design": design,
+        "delivery": delivery,
+        "vat": vat,
+        "customization": customization,
+        "total": base + design + delivery + vat + customization,
+    }
+
+
+def parse_quantity(value):
+    # int() would truncate 2.5 to 2 and turn true into 1
+    if isinstance(value, bool) or not isinstance(value, (int, str)):
+        raise PricingError("Quantity must be a whole number.")
+    try:
+        quantity = int(value)
+    except ValueError:
+        raise PricingError("Quantity must be a whole number.")
+    if quantity <= 0:
+        raise PricingError("Quantity must be greater than 0.")
+    return quantity
+
+
+def parse_id(value, label):
+    """Primary key from request data; None when absent, PricingError when not an integer."""
+    if value is None or value == "":
+        return None
+    # int() would accept floats and bools, and raise TypeError for lists and dicts
+    if isinstance(value, bool) or not isinstance(value, (int, str)):
+        raise PricingError(f"{label} must be an integer id.")
+    try:
+        return int(value)
+    except ValueError:
+        raise PricingError(f"{label} must be an integer id.")
+
+
+def quote_lines(lines, products=None):
+    """
+    Price many lines at once.
+
+    Each line is a dict with ``product_id``, ``quantity`` and optional ``size_id``,
+    ``printing_id`` and ``options``. Products, sizes and printings are loaded with
+    one query each (``products`` may be passed in when the caller already has them).
+    Returns one result per line, in order: either a quote or ``{"error": ...}``.
+    """
+    from .models import Printing, Product, Size
+
+    lines = list(lines)
+    ids = []
+    for line in lines:
+        try:
+            ids.append((
+                parse_id(line.get("product_id"), "product_id"),
+                parse_id(line.get("size_id") or None, "size_id"),
+                parse_id(line.get("printing_id") or None, "printing_id"),
+            ))
+        except PricingError as e:
+            ids.append(e)
+    parsed = [line_ids for line_ids in ids if not isinstance(line_ids, PricingError)]
+    if products is None:
+        product_ids = {product_id for product_id, _, _ in parsed if product_id is not None}
+        products = Product.objects.in_bulk(product_ids) if product_ids else {}
+    size_ids = {size_id for _, size_id, _ in parsed if size_id is not None}
+    printing_ids = {printing_id for _, _, printing_id in parsed if printing_id is not None}
+    sizes = Size.objects.in_bulk(size_ids) if size_ids else {}
+    printings = Printing.objects.in_bulk(printing_ids) if printing_ids else {}
+
+    results = []
+    for line, line_ids in zip(lines, ids):
+        if isinstance(line_ids, PricingError):
+            results.append({"error": str(line_ids)})
+            continue
+        product_id, size_id, printing_id = line_ids
+        try:
+            product = _lookup(products, product_id, "Product")
+            size = _lookup(sizes, size_id, "Size") if size_id is not None else None
+            printing = _lookup(printings, printing_id, "Printing") if printing_id is not None else None
+            quantity = parse_quantity(line.get("quantity"))
+            validate_quantity(product, quantity)
+            results.append({
+                "product_id": product.pk,
+                "quantity": quantity,
+                **quote(product, quantity, size, printing, line.get("options")),
+            })
+        except PricingError as e:
+            results.append({"error": str(e)})
+    return results
+
+
+def _lookup(objects, pk, label):
+    try:
+        return objects[pk]
+    except KeyError:
+        raise PricingError(f"{label} not found.")
@@ -0,0 +1,43 @@
+from django.contrib.postgres.search import (
+    SearchQuery, SearchRank, SearchVector, SearchVectorCombinable, SearchVectorField,
+)
+from django.db.models import F, Func, OuterRef, Subquery
+
+SEARCH_CONFIG = "english"
+
+
+class OptionsSearchVector(SearchVectorCombinable, Func):
+    """Every string value inside the ``options`` JSON, weighted like the description."""
+    template = "setweight(jsonb_to_tsvector('%(config)s'::regconfig, %(expressions)s, '[\"string\"]'), 'C')"
+    output_field = SearchVectorField()
+
+    def as_sql(self, compiler, connection, **extra_context):
+        return super().as_sql(compiler, connection, config=SEARCH_CONFIG, **extra_context)
+
+
+def product_search_vector():
+    """Expression for Product.search_vector, evaluated entirely in the UPDATE statement."""
+    from .models import Category
+
+    category_name = Subquery(Category.objects.filter(pk=OuterRef("category_id")).values("name")[:1])
+    return (
+        SearchVector("name", weight="A", config=SEARCH_CONFIG)
+        + SearchVector(category_name, weight="B", config=SEARCH_CONFIG)
+        + SearchVector("image_description", weight="C", config=SEARCH_CONFIG)
+        + OptionsSearchVector("options")
+    )
+
+
+def refresh_search_vectors(queryset):
+    """Recompute the stored search vector for every product in ``queryset`` in one UPDATE."""
+    return queryset.update(search_vector=product_search_vector())
+
+
+def search_products(queryset, text):
+    """Products matching ``text`` (web-search syntax), best matches first."""
+    query = SearchQuery(text, search_type="websearch", config=SEARCH_CONFIG)
+    return (
+        queryset.filter(search_vector=query)
+        .annotate(rank=SearchRank(F("search_vector"), query))
+        .order_by("-rank", "id")
+    )
@@ -1,37 +1,47 @@
 from rest_framework import serializers
 from .models import Order, Product, Category, Subcategory, ProductImage, Printing, Size, Cart
+from .facets import check_option_lengths
+from .media import MediaURLField, media_url
 
 
 
 class CategorySerializer(serializers.ModelSerializer):
-    image = serializers.ImageField(use_url=True)
-    # thumbnail = serializers.SerializerMethodField()
+    image = MediaURLField()
+    thumbnail = serializers.SerializerMethodField()
 
     class Meta:
         model = Category
-        fields = ['id', 'name', 'image']
+        fields = ['id', 'name', 'image', 'thumbnail']
 
     def get_image(self, obj):
-        return obj.image.url if obj.image else None
+        return media_url(obj.image)
 
-    # def get_thumbnail(self, obj):
-    #     return obj.thumbnail.url if obj.thumbnail else None
+    def get_thumbnail(self, obj):
+        return media_url(obj.thumbnail)
 
 
-class SubcategorySerializer(serializers.ModelSerializer):
-    parent_category = CategorySerializer()
+class SubcategoryTreeSerializer(serializers.ModelSerializer):
+    # Subcategory without its parent, used when the parent is serialized once for many rows
     image = serializers.SerializerMethodField()
     thumbnail = serializers.SerializerMethodField()
 
     class Meta:
         model = Subcategory
-        fields = ['id', 'name', 'image', 'thumbnail', 'parent_category']
+        fields = ['id', 'name', 'image', 'thumbnail']
 
     def get_image(self, obj):
-        return obj.image.url if obj.image else None
+        return media_url(obj.image)
 
     def get_thumbnail(self, obj):
-        return obj.thumbnail.url if obj.thumbnail else None
+        return media_url(obj.thumbnail)
+
+
+class SubcategorySerializer(SubcategoryTreeSerializer):
+    parent_category = CategorySerializer()
+
+    class Meta:
+        model = Subcategory
+        fields = ['id', 'name', 'image', 'thumbnail', 'parent_category']
 
 class OrderSerializer(serializers.ModelSerializer):
     total_price = serializers.ReadOnlyField()
@@ -41,6 +51,9 @@ class OrderSerializer(serializers.ModelSerializer):
         fields = ["id", "product", "quantity", "total_price", "created_at"]
 
 class ProductImageSerializer(serializers.ModelSerializer):
+    image = MediaURLField(read_only=True)
+    thumbnail = MediaURLField(read_only=True)
+
     class Meta:
         model = ProductImage
         fields = ["image", "thumbnail"]
@@ -57,10 +70,36 @@ class ProductSerializer(serializers.ModelSerializer):
             "delivery_charges", "images"
         ]
 
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Sparse field sets (?fields=name,base_price) drop the rest before serializing
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+    def validate_options(self, value):
+        try:
+            check_option_lengths(value)
+        except ValueError as e:
+            raise serializers.ValidationError(str(e))
+        return value
+
     def get_parent_category(self, obj):
         return obj.category.parent.name if obj.category and obj.category.parent else None
 
 
+class ProductListSerializer(ProductSerializer):
+    class Meta(ProductSerializer.Meta):
+        fields = ["id", *ProductSerializer.Meta.fields]
+
+
+class ProductSearchSerializer(ProductListSerializer):
+    rank = serializers.FloatField(read_only=True)
+
+    class Meta(ProductListSerializer.Meta):
+        fields = [*ProductListSerializer.Meta.fields, "rank"]
+
+
 
 
 class CartSerializer(serializers.ModelSerializer):
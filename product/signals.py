@@ -0,0 +1,91 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .cache import CATALOG_VERSION_KEY, CATEGORY_TREE_VERSION_KEY, bump_version_on_commit
+from .models import Category, Product, ProductImage, Subcategory
+from .facets import apply_delta, option_pairs
+from .search import refresh_search_vectors
+from .thumbnails import delete_file_on_commit, enqueue
+
+
+@receiver([post_save, post_delete], sender=Category)
+@receiver([post_save, post_delete], sender=Subcategory)
+def invalidate_category_tree(sender, **kwargs):
+    bump_version_on_commit(CATEGORY_TREE_VERSION_KEY)
+
+
+@receiver([post_save, post_delete], sender=Product)
+def invalidate_catalog(sender, **kwargs):
+    bump_version_on_commit(CATALOG_VERSION_KEY)
+
+
+@receiver([post_save, post_delete], sender=ProductImage)
+def touch_product(sender, instance, **kwargs):
+    # Images are part of the product payload, so they move the product's validators too
+    Product.objects.filter(pk=instance.product_id).update(updated_at=timezone.now())
+    bump_version_on_commit(CATALOG_VERSION_KEY)
+
+
+@receiver(pre_save, sender=Category)
+@receiver(pre_save, sender=Subcategory)
+@receiver(pre_save, sender=ProductImage)
+def remember_image_name(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and "image" not in update_fields:
+        return
+    old_name = None
+    if instance.pk is not None:
+        old_name = sender.objects.filter(pk=instance.pk).values_list("image", flat=True).first()
+    instance._old_image_name = old_name
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_save, sender=Subcategory)
+@receiver(post_save, sender=ProductImage)
+def queue_thumbnail(sender, instance, **kwargs):
+    if not hasattr(instance, "_old_image_name"):
+        return
+    # Only a new or replaced image needs a new thumbnail
+    old_name = instance.__dict__.pop("_old_image_name")
+    if instance.image and instance.image.name != old_name:
+        enqueue([instance])
+
+
+@receiver(post_delete, sender=ProductImage)
+def delete_thumbnail_file(sender, instance, **kwargs):
+    if instance.thumbnail:
+        delete_file_on_commit(instance.thumbnail.storage, instance.thumbnail.name)
+
+
+@receiver(post_save, sender=Product)
+def index_product(sender, instance, **kwargs):
+    refresh_search_vectors(Product.objects.filter(pk=instance.pk))
+
+
+@receiver(post_save, sender=Category)
+def reindex_category_products(sender, instance, created, **kwargs):
+    # The category name is part of each product's search vector
+    if not created:
+        refresh_search_vectors(Product.objects.filter(category_id=instance.pk))
+
+
+@receiver(pre_save, sender=Product)
+def remember_option_pairs(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and "options" not in update_fields:
+        return
+    old_options = None
+    if instance.pk is not None:
+        old_options = Product.objects.filter(pk=instance.pk).values_list("options", flat=True).first()
+    instance._old_option_pairs = option_pairs(old_options)
+
+
+@receiver(post_save, sender=Product)
+def update_option_facets(sender, instance, **kwargs):
+    if not hasattr(instance, "_old_option_pairs"):
+        return
+    apply_delta(instance.__dict__.pop("_old_option_pairs"), option_pairs(instance.options))
+
+
+@receiver(post_delete, sender=Product)
+def remove_option_facets(sender, instance, **kwargs):
+    apply_delta(option_pairs(instance.options), set())
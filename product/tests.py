@@ -1,3 +1,727 @@
-from django.test import TestCase
+import io
+import json
+import shutil
+import tempfile
+import time
+from decimal import Decimal
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import OperationalError, connection, connections
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from PIL import Image
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from my_app.models import CustomUser
+from .cache import CATEGORY_TREE_VERSION_KEY, catalog_response_key, get_cached_categories, get_or_build, get_version
+from .checks import shared_cache_check
+from .media import cached_url, clear_url_cache
+from .models import Cart, Category, Printing, Product, ProductImage, ProductOptionFacet, Size, Subcategory, ThumbnailJob
+from .pricing import line_subtotal, quote_lines
+from .serializers import ProductImageSerializer
+
+
+class CatalogFixtureMixin:
+    """Small catalog with several products and images per product."""
+
+    product_count = 5
+    images_per_product = 3
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(
+            username="shopper", email="shopper@example.com", password="secret", is_authorized=True
+        )
+        cls.category = Category.objects.create(name="Flyers", image="categories/flyers.png")
+        cls.subcategories = [
+            Subcategory.objects.create(
+                name=f"Flyers {i}", parent_category=cls.category, image=f"subcategories/{i}.png"
+            )
+            for i in range(3)
+        ]
+        cls.size = Size.objects.create(name="A4", price_multiplier=Decimal("1.50"))
+        cls.printing = Printing.objects.create(quality="Gloss", price_multiplier=Decimal("1.20"))
+        cls.products = []
+        for i in range(cls.product_count):
+            product = Product.objects.create(
+                name=f"Flyer {i}", category=cls.category, base_price=Decimal("10.00"), vat_percent=20.0
+            )
+            ProductImage.objects.bulk_create(
+                ProductImage(product=product, image=f"products/images/{i}-{j}.png")
+                for j in range(cls.images_per_product)
+            )
+            Cart.objects.create(user=cls.user, product=product, size=cls.size, printing=cls.printing, quantity=2)
+            cls.products.append(product)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+
+class CatalogQueryBudgetTests(CatalogFixtureMixin, TestCase):
+    """Each endpoint must cost a fixed number of queries regardless of how many rows it returns."""
+
+    def assertQueryBudget(self, url, budget):
+        with self.assertNumQueries(budget):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response
+
+    def test_product_list(self):
+        response = self.assertQueryBudget("/v2/products", 2)
+        self.assertEqual(len(response.data), self.product_count)
+        self.assertEqual(len(response.data[0]["images"]), self.images_per_product)
+
+    def test_admin_product_page(self):
+        # COUNT(*) + page + images
+        self.assertQueryBudget("/v2/admin/products?page_size=20", 3)
+
+    def test_products_by_subcategory(self):
+        response = self.assertQueryBudget(f"/v2/product-subcatgeory/{self.subcategories[0].id}", 3)
+        self.assertEqual(len(response.data), self.product_count)
+
+    def test_product_detail(self):
+        # validators + product + images
+        self.assertQueryBudget(f"/v2/products/{self.products[0].id}", 3)
+
+    def test_category_lists(self):
+        # categories + subcategories to build the cached tree, then nothing
+        self.assertQueryBudget("/v2/category", 2)
+        self.assertQueryBudget("/v2/category", 0)
+        self.assertQueryBudget("/v2/categories", 0)
+
+    def test_subcategories(self):
+        response = self.assertQueryBudget(f"/v2/sub-category/{self.category.id}", 2)
+        self.assertEqual(len(response.data), len(self.subcategories))
+        self.assertEqual(response.data[0]["parent_category"]["name"], self.category.name)
+        self.assertQueryBudget(f"/v2/sub-category/{self.category.id}", 0)
+
+    def test_cart(self):
+        response = self.assertQueryBudget("/v2/cart", 1)
+        self.assertEqual(len(response.data), self.product_count)
+        self.assertEqual(Decimal(response.data[0]["total_price"]), Decimal("36.00"))
+
+
+class CartTotalsTests(CatalogFixtureMixin, TestCase):
+    def test_summary_is_one_query(self):
+        # A line without size/printing prices at the bare base price
+        Cart.objects.create(user=self.user, product=self.products[0], quantity=3)
+        with self.assertNumQueries(1):
+            response = self.client.get("/v2/cart/summary")
+        self.assertEqual(response.status_code, 200)
+        # 5 lines of 10.00 * 1.5 * 1.2 * 2 plus one of 10.00 * 3, all at 20% VAT
+        self.assertEqual(response.data["line_count"], self.product_count + 1)
+        self.assertEqual(response.data["item_count"], self.product_count * 2 + 3)
+        self.assertEqual(response.data["subtotal"], Decimal("210.00"))
+        self.assertEqual(response.data["vat"], Decimal("42.00"))
+        self.assertEqual(response.data["total"], Decimal("252.00"))
+
+    def test_summary_total_matches_quote_lines(self):
+        Product.objects.filter(pk=self.products[0].pk).update(
+            additional_design_charge=Decimal("0.75"), delivery_charges=Decimal("4.99"),
+        )
+        lines = [
+            {"product_id": line.product_id, "size_id": line.size_id, "printing_id": line.printing_id, "quantity": line.quantity}
+            for line in Cart.objects.filter(user=self.user)
+        ]
+        quoted = quote_lines(lines)
+        summary = Cart.objects.filter(user=self.user).summary()
+        for component in ("design", "delivery", "vat", "total"):
+            self.assertEqual(summary[component], sum(line[component] for line in quoted), component)
+        self.assertEqual(summary["design"] + summary["delivery"], Decimal("6.49"))
+
+    def test_sql_line_totals_match_pricing(self):
+        for line in Cart.objects.with_totals():
+            self.assertEqual(line.line_total, line_subtotal(line.product, line.quantity, line.size, line.printing))
+
+    def test_empty_cart(self):
+        self.client.force_authenticate(CustomUser.objects.create_user(username="new", password="x"))
+        response = self.client.get("/v2/cart/summary")
+        self.assertEqual((response.data["item_count"], response.data["total"]), (0, Decimal("0.00")))
+
+
+class CartUpsertTests(CatalogFixtureMixin, TestCase):
+    def test_bulk_add_increments_existing_lines_in_one_statement(self):
+        items = [
+            {"product": product.id, "size": self.size.id, "printing": self.printing.id, "quantity": 1}
+            for product in self.products
+        ]
+        items += [{"product": self.products[0].id, "quantity": 4}, {"product": self.products[0].id, "quantity": 1}]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post("/v2/cart/bulk", {"items": items}, format="json")
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(sum("ON CONFLICT" in q["sql"] for q in queries), 1)
+        # products + sizes + printings + upsert + reload
+        self.assertEqual(len(queries), 5)
+
+        quantities = {(line.product_id, line.size_id): line.quantity for line in Cart.objects.filter(user=self.user)}
+        self.assertEqual(quantities[(self.products[0].id, self.size.id)], 3)
+        self.assertEqual(quantities[(self.products[0].id, None)], 5)
+        self.assertEqual(Cart.objects.filter(user=self.user).count(), self.product_count + 1)
+
+    def test_bulk_set_overwrites_quantities(self):
+        items = [{"product": self.products[1].id, "size": self.size.id, "printing": self.printing.id, "quantity": 7}]
+        response = self.client.post("/v2/cart/bulk", {"items": items, "mode": "set"}, format="json")
+        self.assertEqual(response.data[0]["quantity"], 7)
+        self.assertEqual(Decimal(response.data[0]["total_price"]), Decimal("126.00"))
+
+    def test_invalid_items_reject_the_batch(self):
+        items = [{"product": self.products[0].id, "quantity": 1}, {"product": 999999}, {"quantity": 2}]
+        response = self.client.post("/v2/cart/bulk", {"items": items}, format="json")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([e["index"] for e in response.data["errors"]], [1, 2])
+        self.assertEqual(Cart.objects.filter(user=self.user).count(), self.product_count)
+
+    def test_bulk_add_validates_each_quantity(self):
+        Product.objects.filter(pk=self.products[1].pk).update(minimum_qty=10, qty_step_count=5)
+        items = [
+            {"product": self.products[0].id, "quantity": 2.5},
+            {"product": self.products[0].id, "quantity": True},
+            {"product": self.products[1].id, "quantity": 5},
+            {"product": self.products[1].id, "quantity": 15},
+            {"product": "abc"},
+        ]
+        response = self.client.post("/v2/cart/bulk", {"items": items}, format="json")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([e["index"] for e in response.data["errors"]], [0, 1, 2, 4])
+        self.assertIn("minimum quantity", response.data["errors"][2]["error"])
+        self.assertEqual(Cart.objects.filter(user=self.user).count(), self.product_count)
+
+    def test_single_add_bumps_the_existing_line(self):
+        payload = {"product": self.products[2].id, "size": self.size.id, "printing": self.printing.id, "quantity": 3}
+        response = self.client.post("/v2/cart", payload, format="json")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data["quantity"], 5)
+
+    def test_single_add_rejects_invalid_quantities(self):
+        for quantity in ("many", 0, -2, [1]):
+            payload = {"product": self.products[2].id, "quantity": quantity}
+            response = self.client.post("/v2/cart", payload, format="json")
+            self.assertEqual(response.status_code, 400, quantity)
+        self.assertEqual(Cart.objects.filter(user=self.user).count(), self.product_count)
+
+
+class CategoryTreeCacheTests(CatalogFixtureMixin, TestCase):
+    def test_changes_invalidate_the_tree(self):
+        self.client.get("/v2/category")
+        with self.captureOnCommitCallbacks(execute=True):
+            Category.objects.create(name="Banners", image="categories/banners.png")
+        names = [row["name"] for row in self.client.get("/v2/category").data]
+        self.assertEqual(names, ["Flyers", "Banners"])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.subcategories[0].delete()
+        response = self.client.get(f"/v2/sub-category/{self.category.id}")
+        self.assertEqual(len(response.data), len(self.subcategories) - 1)
+
+    def test_version_is_bumped_only_once_the_write_commits(self):
+        version = get_version(CATEGORY_TREE_VERSION_KEY)
+        with self.captureOnCommitCallbacks() as callbacks:
+            Category.objects.create(name="Banners", image="categories/banners.png")
+            # A concurrent request would still cache the old rows, under the old version
+            self.assertEqual(get_version(CATEGORY_TREE_VERSION_KEY), version)
+        for callback in callbacks:
+            callback()
+        self.assertGreater(get_version(CATEGORY_TREE_VERSION_KEY), version)
+
+    @override_settings(DEBUG=False)
+    def test_per_process_cache_is_flagged_outside_debug(self):
+        self.assertEqual([w.id for w in shared_cache_check(None)], ["product.W001"])
+
+    def test_unknown_category_is_404(self):
+        self.assertEqual(self.client.get("/v2/sub-category/999999").status_code, 404)
+
+
+class ProductFeedPaginationTests(CatalogFixtureMixin, TestCase):
+    def test_cursor_mode_walks_every_product_once(self):
+        names = []
+        url = "/v2/admin/products?pagination=cursor&page_size=2"
+        while url:
+            # page + images, no COUNT(*)
+            with self.assertNumQueries(2):
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            names.extend(row["name"] for row in response.data["results"])
+            url = response.data["next"]
+        self.assertEqual(names, [product.name for product in self.products])
+
+
+class ConditionalGetTests(CatalogFixtureMixin, TestCase):
+    def test_product_detail_revalidation(self):
+        url = f"/v2/products/{self.products[0].id}"
+        response = self.client.get(url)
+        self.assertIn("ETag", response)
+        self.assertIn("Last-Modified", response)
+
+        with self.assertNumQueries(1):
+            cached = self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(cached.status_code, 304)
+
+        ProductImage.objects.create(product=self.products[0], image="products/images/new.png")
+        changed = self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed["ETag"], response["ETag"])
+
+    def test_detail_route_revalidation(self):
+        url = f"/v2/product-detail/{self.products[0].id}"
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["name"], self.products[0].name)
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"]).status_code, 304)
+        self.assertEqual(self.client.get("/v2/product-detail/999999").status_code, 404)
+
+    def test_catalog_revalidation(self):
+        response = self.client.get("/v2/products")
+        with self.assertNumQueries(0):
+            cached = self.client.get("/v2/products", HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(cached.status_code, 304)
+
+        self.products[1].name = "Renamed"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.products[1].save()
+        self.assertEqual(self.client.get("/v2/products", HTTP_IF_NONE_MATCH=response["ETag"]).status_code, 200)
+
+
+class AsyncCatalogViewTests(CatalogFixtureMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+        token = RefreshToken.for_user(self.user).access_token
+        self.headers = {"Authorization": f"Bearer {token}"}
+
+    async def test_async_endpoints_match_sync_payloads(self):
+        sync_client = APIClient()
+        await sync_to_async(sync_client.force_authenticate)(self.user)
+        for path in ["category", f"sub-category/{self.category.id}", "products", f"products/{self.products[0].id}"]:
+            response = await self.async_client.get(f"/v2/async/{path}", headers=self.headers)
+            self.assertEqual(response.status_code, 200, path)
+            expected = await sync_to_async(sync_client.get)(f"/v2/{path}")
+            self.assertEqual(response.json(), json.loads(expected.content), path)
+
+    async def test_async_endpoints_require_authentication(self):
+        response = await self.async_client.get("/v2/async/products")
+        self.assertEqual(response.status_code, 401)
+        response = await self.async_client.get("/v2/async/products", headers={"Authorization": "Bearer junk"})
+        self.assertEqual(response.status_code, 401)
+
+    async def test_async_product_detail_revalidation(self):
+        url = f"/v2/async/products/{self.products[0].id}"
+        response = await self.async_client.get(url, headers=self.headers)
+        cached = await self.async_client.get(url, headers={**self.headers, "If-None-Match": response["ETag"]})
+        self.assertEqual(cached.status_code, 304)
+        missing = await self.async_client.get("/v2/async/products/999999", headers=self.headers)
+        self.assertEqual(missing.status_code, 404)
+
+
+class TemporaryMediaMixin:
+    """Store uploads in a throwaway MEDIA_ROOT."""
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def upload(self, name, size=(1600, 1200)):
+        buffer = io.BytesIO()
+        Image.new("RGB", size, "red").save(buffer, format="PNG")
+        return SimpleUploadedFile(name, buffer.getvalue(), content_type="image/png")
+
+    def stored_files(self):
+        return sorted(path.name for path in Path(self.media_root).rglob("*") if path.is_file())
+
+
+class ThumbnailPipelineTests(TemporaryMediaMixin, TestCase):
+
+    def test_upload_queues_job_and_worker_writes_webp(self):
+        category = Category.objects.create(name="Cards", image=self.upload("cards.png"))
+        self.assertFalse(category.thumbnail)
+        self.assertEqual(ThumbnailJob.objects.filter(model="category", object_id=category.id).count(), 1)
+
+        call_command("process_thumbnails", stdout=io.StringIO())
+
+        category.refresh_from_db()
+        self.assertTrue(category.thumbnail.name.endswith(".webp"))
+        with Image.open(category.thumbnail.path) as thumbnail:
+            self.assertEqual(thumbnail.format, "WEBP")
+            self.assertLessEqual(max(thumbnail.size), 400)
+        self.assertEqual(ThumbnailJob.objects.get().status, ThumbnailJob.DONE)
+        # The cached tree picks up the new thumbnail URL
+        self.assertTrue(get_cached_categories()[0]["thumbnail"].endswith(".webp"))
+
+        # Saving without a new image does not queue more work
+        category.name = "Business cards"
+        category.save()
+        self.assertEqual(ThumbnailJob.objects.count(), 1)
+
+        # Whatever the new file is called, replacing the image queues it again
+        category.image = self.upload("card.png")
+        category.save()
+        self.assertEqual(ThumbnailJob.objects.count(), 2)
+
+    def test_replaced_and_deleted_thumbnails_are_removed_from_storage(self):
+        category = Category.objects.create(name="Cards", image=self.upload("cards.png"))
+        product = Product.objects.create(name="Card", category=category, base_price=Decimal("1.00"))
+        image = ProductImage.objects.create(product=product, image=self.upload("front.png"))
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command("process_thumbnails", stdout=io.StringIO())
+        image.refresh_from_db()
+        first = image.thumbnail.name
+
+        image.image = self.upload("front-v2.png")
+        image.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command("process_thumbnails", stdout=io.StringIO())
+        image.refresh_from_db()
+        self.assertNotEqual(image.thumbnail.name, first)
+        self.assertFalse(image.thumbnail.storage.exists(first))
+
+        second = image.thumbnail.name
+        with self.captureOnCommitCallbacks(execute=True):
+            image.delete()
+        self.assertFalse(image.thumbnail.storage.exists(second))
+        self.assertEqual(len([name for name in self.stored_files() if name.endswith(".webp")]), 1)  # the category's
+
+    def test_backfill_queues_only_missing_thumbnails(self):
+        category = Category.objects.create(name="Cards", image=self.upload("cards.png"))
+        product = Product.objects.create(name="Card", category=category, base_price=Decimal("1.00"))
+        ProductImage.objects.bulk_create([
+            ProductImage(product=product, image=self.upload("a.png")),
+            ProductImage(product=product, image=self.upload("b.png")),
+        ])
+        ThumbnailJob.objects.all().delete()
+
+        call_command("backfill_thumbnails", stdout=io.StringIO())
+        self.assertEqual(ThumbnailJob.objects.filter(model="productimage").count(), 2)
+        self.assertEqual(ThumbnailJob.objects.filter(model="category").count(), 1)
+
+        call_command("process_thumbnails", stdout=io.StringIO())
+        self.assertFalse(ProductImage.objects.filter(thumbnail="").exists())
+        self.assertFalse(ThumbnailJob.objects.exclude(status=ThumbnailJob.DONE).exists())
+
+
+class ProductImageUploadTests(TemporaryMediaMixin, CatalogFixtureMixin, TestCase):
+    def create_product(self, image_count):
+        return self.client.post("/v2/admin/products", {
+            "name": "Sticker", "base_price": "3.00", "category": self.category.id,
+            "images": [self.upload(f"sticker-{i}.png", size=(50, 50)) for i in range(image_count)],
+        }, format="multipart")
+
+    def test_images_are_inserted_in_one_statement(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.create_product(6)
+        self.assertEqual(response.status_code, 201, response.content)
+        image_inserts = [q for q in queries if q["sql"].startswith('INSERT INTO "product_productimage"')]
+        self.assertEqual(len(image_inserts), 1)
+        product = Product.objects.get(name="Sticker")
+        self.assertEqual(product.images.count(), 6)
+        self.assertEqual(len(response.data["product"]["images"]), 6)
+        self.assertEqual(ThumbnailJob.objects.filter(model="productimage").count(), 6)
+
+    def test_failed_upload_removes_partial_files_and_product(self):
+        real_save = FileSystemStorage.save
+        calls = []
+
+        def flaky_save(storage, name, content, max_length=None):
+            calls.append(name)
+            if len(calls) == 3:
+                raise OSError("storage unavailable")
+            return real_save(storage, name, content, max_length=max_length)
+
+        with mock.patch.object(FileSystemStorage, "save", flaky_save):
+            response = self.create_product(4)
+        self.assertEqual(response.status_code, 500)
+        self.assertFalse(Product.objects.filter(name="Sticker").exists())
+        self.assertEqual(self.stored_files(), [])
+
+    def test_uploads_run_before_the_transaction_and_are_removed_if_it_fails(self):
+        real_save = FileSystemStorage.save
+        depths = []
+        request_connection = connections["default"]  # uploads run on pool threads
+
+        def recording_save(storage, name, content, max_length=None):
+            depths.append(len(request_connection.savepoint_ids))
+            return real_save(storage, name, content, max_length=max_length)
+
+        depth = len(request_connection.savepoint_ids)
+        with mock.patch.object(FileSystemStorage, "save", recording_save), \
+                mock.patch.object(ProductImage.objects, "bulk_create", side_effect=OperationalError("insert failed")):
+            response = self.create_product(3)
+        self.assertEqual(depths, [depth] * 3)
+        self.assertEqual(response.status_code, 500)
+        self.assertFalse(Product.objects.filter(name="Sticker").exists())
+        self.assertEqual(self.stored_files(), [])
+
+
+class MediaURLCacheTests(TestCase):
+    def setUp(self):
+        clear_url_cache()
+        self.addCleanup(clear_url_cache)
+
+    def test_urls_are_reused_within_a_window(self):
+        storage = mock.Mock(spec=["url"], querystring_auth=True, querystring_expire=600)
+        storage.url.side_effect = lambda name: f"https://signed.example/{name}?sig={storage.url.call_count}"
+        with mock.patch("product.media.time.time", return_value=1000.0):
+            first = cached_url(storage, "a.png")
+            self.assertEqual(cached_url(storage, "a.png"), first)
+            cached_url(storage, "b.png")
+        self.assertEqual(storage.url.call_count, 2)
+
+        # Signed URLs are reused for half their lifetime at most
+        with mock.patch("product.media.time.time", return_value=1000.0 + 300):
+            self.assertNotEqual(cached_url(storage, "a.png"), first)
+        self.assertEqual(storage.url.call_count, 3)
+
+    def test_serializer_output_is_unchanged(self):
+        image = ProductImage(image="products/images/a.png")
+        self.assertEqual(ProductImageSerializer(image).data, {"image": image.image.url, "thumbnail": None})
+
+
+class ProductSearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(username="finder", password="secret")
+        cls.cards = Category.objects.create(name="Business Cards", image="categories/cards.png")
+        cls.posters = Category.objects.create(name="Posters", image="categories/posters.png")
+        cls.matte = Product.objects.create(
+            name="Premium card", category=cls.cards, base_price=Decimal("2.00"),
+            options={"paper": "matte", "finishes": ["spot varnish"]},
+        )
+        cls.glossy = Product.objects.create(
+            name="Classic card", category=cls.cards, base_price=Decimal("1.00"),
+            image_description="Glossy card stock", options={"paper": "glossy"},
+        )
+        cls.poster = Product.objects.create(name="Event poster", category=cls.posters, base_price=Decimal("5.00"))
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def search(self, text):
+        response = self.client.get("/v2/products/search", {"q": text, "page_size": 20})
+        self.assertEqual(response.status_code, 200, response.content)
+        return [row["id"] for row in response.data["results"]]
+
+    def test_matches_name_category_description_and_options(self):
+        self.assertEqual(self.search("poster"), [self.poster.id])
+        self.assertEqual(self.search("business"), [self.matte.id, self.glossy.id])
+        self.assertEqual(self.search("glossy"), [self.glossy.id])
+        self.assertEqual(self.search("varnish"), [self.matte.id])
+        self.assertEqual(self.search("card -glossy"), [self.matte.id])
+
+    def test_name_matches_rank_above_description_matches(self):
+        Product.objects.create(name="Glossy flyer", base_price=Decimal("1.00"))
+        self.assertEqual(self.search("glossy")[1:], [self.glossy.id])
+
+    def test_vectors_follow_product_and_category_changes(self):
+        self.poster.options = {"paper": "satin"}
+        self.poster.save()
+        self.assertEqual(self.search("satin"), [self.poster.id])
+
+        self.posters.name = "Wall art"
+        self.posters.save()
+        self.assertEqual(self.search("wall"), [self.poster.id])
+
+    def test_rebuild_command_and_missing_query(self):
+        Product.objects.update(search_vector=None)
+        call_command("rebuild_search_index", batch_size=2, stdout=io.StringIO())
+        self.assertEqual(self.search("poster"), [self.poster.id])
+        self.assertEqual(self.client.get("/v2/products/search").status_code, 400)
+
+
+class OptionFacetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(username="browser", password="secret")
+        cls.cards = Category.objects.create(name="Business Cards", image="categories/cards.png")
+        cls.matte = Product.objects.create(
+            name="Matte card", category=cls.cards, base_price=Decimal("2.00"),
+            options={"paper": "matte", "colors": ["red", "blue"], "sides": 2},
+        )
+        cls.glossy = Product.objects.create(
+            name="Glossy card", category=cls.cards, base_price=Decimal("1.00"),
+            options={"paper": "glossy", "colors": ["red"]},
+        )
+        cls.plain = Product.objects.create(name="Plain card", base_price=Decimal("1.00"))
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def counts(self):
+        return {(f.key, f.value): f.count for f in ProductOptionFacet.objects.all()}
+
+    def filtered(self, *options):
+        response = self.client.get("/v2/products/filter", {"option": list(options), "page_size": 20})
+        self.assertEqual(response.status_code, 200, response.content)
+        return [row["id"] for row in response.data["results"]]
+
+    def test_counts_follow_saves_and_deletes(self):
+        self.assertEqual(self.counts(), {
+            ("paper", "matte"): 1, ("paper", "glossy"): 1, ("colors", "red"): 2, ("colors", "blue"): 1, ("sides", "2"): 1,
+        })
+
+        self.glossy.options = {"paper": "matte"}
+        self.glossy.save()
+        self.matte.delete()
+        self.assertEqual(self.counts(), {("paper", "matte"): 1})
+
+    def test_legacy_string_rows_count_only_once_they_match(self):
+        self.plain.options = json.dumps({"paper": "kraft"})
+        self.plain.save()
+        self.assertNotIn(("paper", "kraft"), self.counts())
+        self.assertEqual(self.filtered("paper:kraft"), [])
+
+        call_command("rebuild_option_facets", stdout=io.StringIO())
+        self.plain.refresh_from_db()
+        self.assertEqual(self.plain.options, {"paper": "kraft"})
+        self.assertEqual(self.counts()[("paper", "kraft")], 1)
+        self.assertEqual(self.filtered("paper:kraft"), [self.plain.id])
+
+    def test_rebuild_command(self):
+        ProductOptionFacet.objects.all().delete()
+        Product.objects.filter(pk=self.plain.pk).update(options=json.dumps({"paper": "kraft"}))
+        call_command("rebuild_option_facets", stdout=io.StringIO())
+        self.assertEqual(self.counts()[("paper", "kraft")], 1)
+        self.assertEqual(self.counts()[("colors", "red")], 2)
+
+    def test_filter_is_or_within_a_key_and_and_across_keys(self):
+        self.assertEqual(self.filtered("colors:red"), [self.matte.id, self.glossy.id])
+        self.assertEqual(self.filtered("paper:matte", "paper:glossy"), [self.matte.id, self.glossy.id])
+        self.assertEqual(self.filtered("colors:red", "paper:glossy"), [self.glossy.id])
+        self.assertEqual(self.filtered("sides:2"), [self.matte.id])
+        self.assertEqual(self.client.get("/v2/products/filter", {"option": "paper"}).status_code, 400)
+
+    def test_overlong_option_keys_are_rejected_and_never_counted(self):
+        long_key = "k" * 101
+        admin = CustomUser.objects.create_user(username="admin", password="secret", is_authorized=True)
+        self.client.force_authenticate(admin)
+        response = self.client.post("/v2/admin/products", {
+            "name": "Long", "base_price": "1.00", "options": json.dumps({long_key: "x"}),
+        }, format="multipart")
+        self.assertEqual(response.status_code, 400, response.content)
+        self.assertIn("options", response.data)
+
+        # Rows written around the serializer are left out of the facets rather than truncated
+        Product.objects.create(name="Long", base_price=Decimal("1.00"), options={long_key: "x", "paper": "y" * 256})
+        self.assertFalse([key for key, _ in self.counts() if key.startswith("k")])
+        self.assertNotIn(("paper", "y" * 255), self.counts())
+
+    def test_filter_rejects_a_non_numeric_category(self):
+        response = self.client.get("/v2/products/filter", {"option": "paper:matte", "category_id": "abc"})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.filtered("paper:matte"), [self.matte.id])
+
+    def test_facets_endpoint(self):
+        response = self.client.get("/v2/products/facets")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["colors"], [{"value": "red", "count": 2}, {"value": "blue", "count": 1}])
+
+    def test_options_helpers_store_a_dict(self):
+        self.plain.set_options({"paper": "linen"})
+        self.plain.save()
+        self.plain.refresh_from_db()
+        self.assertEqual(self.plain.options, {"paper": "linen"})
+        self.plain.options = json.dumps({"paper": "legacy"})
+        self.assertEqual(self.plain.get_options(), {"paper": "legacy"})
+
+
+class CatalogResponseCacheTests(CatalogFixtureMixin, TestCase):
+    def test_listing_cached_per_variant_until_the_catalog_changes(self):
+        first = self.client.get("/v2/products")
+        self.assertEqual(len(first.data), self.product_count)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get("/v2/products").data, first.data)
+
+        sparse = self.client.get("/v2/products", {"fields": "name,base_price"})
+        self.assertEqual(set(sparse.data[0]), {"name", "base_price"})
+        self.assertNotEqual(sparse["ETag"], first["ETag"])
+        self.assertEqual(self.client.get("/v2/products", {"fields": "name,nope"}).status_code, 400)
+        self.assertEqual(self.client.get("/v2/admin/products", {"fields": "nope"}).status_code, 400)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            other = Category.objects.create(name="Posters", image="categories/posters.png")
+            Product.objects.create(name="Poster", category=other, base_price=Decimal("5.00"))
+        self.assertEqual([p["name"] for p in self.client.get("/v2/products", {"category_id": other.id}).data], ["Poster"])
+        self.assertEqual(len(self.client.get("/v2/products").data), self.product_count + 1)
+
+    def test_admin_listing_cached_per_page(self):
+        page_two = self.client.get("/v2/admin/products", {"page": 2})
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get("/v2/admin/products", {"page": 2}).data, page_two.data)
+        self.assertNotEqual(self.client.get("/v2/admin/products", {"page": 1}).data, page_two.data)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            ProductImage.objects.create(product=self.products[2], image="products/images/extra.png")
+        images = self.client.get("/v2/admin/products", {"page": 2}).data["results"][0]["images"]
+        self.assertEqual(len(images), self.images_per_product + 1)
+
+    def test_admin_listing_links_follow_the_request_scheme(self):
+        self.assertTrue(self.client.get("/v2/admin/products", {"page": 1}).data["next"].startswith("http://"))
+        self.assertTrue(self.client.get("/v2/admin/products", {"page": 1}, secure=True).data["next"].startswith("https://"))
+
+    def test_listing_served_stale_during_a_rebuild_carries_no_etag(self):
+        self.client.get("/v2/products")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.products[0].save()
+        key = catalog_response_key("products", {"category_id": "", "fields": ""})
+        cache.add(f"{key}:lock", 1)
+        response = self.client.get("/v2/products")
+        self.assertEqual(len(response.data), self.product_count)
+        self.assertNotIn("ETag", response)
+
+
+class SingleFlightCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.builds = 0
+
+    def build(self):
+        self.builds += 1
+        return f"payload {self.builds}"
+
+    def test_expired_entry_is_refreshed_by_one_caller(self):
+        cache.set("k", (0, "old"), None)
+        cache.add("k:lock", 1)
+        self.assertEqual(get_or_build("k", self.build), ("old", True))  # someone else is rebuilding
+        self.assertEqual(self.builds, 0)
+
+        cache.delete("k:lock")
+        self.assertEqual(get_or_build("k", self.build), ("payload 1", True))
+        self.assertEqual(get_or_build("k", self.build), ("payload 1", True))
+        self.assertEqual(self.builds, 1)
+        self.assertIsNone(cache.get("k:lock"))
+
+    def test_miss_after_a_bump_serves_the_previous_payload_while_one_caller_builds(self):
+        self.assertEqual(get_or_build("v1", self.build, stale_key="latest"), ("payload 1", True))
+        cache.add("v2:lock", 1)
+        with mock.patch("product.cache.time.sleep") as sleep:
+            self.assertEqual(get_or_build("v2", self.build, stale_key="latest"), ("payload 1", False))
+        sleep.assert_not_called()
+        self.assertEqual(self.builds, 1)
+
+        cache.delete("v2:lock")
+        self.assertEqual(get_or_build("v2", self.build, stale_key="latest"), ("payload 2", True))
+        self.assertEqual(cache.get("latest"), "payload 2")
+
+    def test_miss_without_a_stale_payload_waits_briefly_then_builds_uncached(self):
+        cache.add("k:lock", 1)
+        with mock.patch("product.cache.time.sleep", side_effect=lambda _: cache.set("k", (time.time() + 60, "theirs"))):
+            self.assertEqual(get_or_build("k", self.build), ("theirs", True))
+        self.assertEqual(self.builds, 0)
+
+        cache.add("slow:lock", 1)
+        with override_settings(CATALOG_RESPONSE_LOCK_WAIT=0):
+            self.assertEqual(get_or_build("slow", self.build), ("payload 1", True))
+        self.assertIsNone(cache.get("slow"))  # left for the lock holder to store
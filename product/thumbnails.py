@@ -0,0 +1,127 @@
+import io
+from datetime import timedelta
+from pathlib import PurePosixPath
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from .cache import CATALOG_VERSION_KEY, CATEGORY_TREE_VERSION_KEY, bump_version_on_commit
+from .models import Product, ThumbnailJob
+
+THUMBNAIL_MODELS = ("category", "subcategory", "productimage")
+MAX_ATTEMPTS = 3
+STALE_AFTER = timedelta(minutes=10)  # Running jobs older than this belong to a dead worker
+
+
+def get_model(name):
+    return apps.get_model("product", name)
+
+
+def render_thumbnail(image_file):
+    """Resize an image to fit THUMBNAIL_SIZE and encode it as WebP."""
+    size = getattr(settings, "THUMBNAIL_SIZE", (400, 400))
+    quality = getattr(settings, "THUMBNAIL_QUALITY", 80)
+    image_file.open("rb")
+    try:
+        with Image.open(image_file) as image:
+            image = ImageOps.exif_transpose(image)
+            image.thumbnail(size)
+            if image.mode not in ("RGB", "RGBA"):
+                image = image.convert("RGBA" if "A" in image.getbands() else "RGB")
+            buffer = io.BytesIO()
+            image.save(buffer, format="WEBP", quality=quality)
+    finally:
+        image_file.close()
+    return ContentFile(buffer.getvalue())
+
+
+def delete_file_on_commit(storage, name):
+    """Remove a stored file once the rows that stopped pointing at it are committed."""
+    transaction.on_commit(lambda: storage.delete(name))
+
+
+def enqueue(instances):
+    """Queue thumbnail generation for saved Category/Subcategory/ProductImage rows."""
+    jobs = [
+        ThumbnailJob(model=instance._meta.model_name, object_id=instance.pk)
+        for instance in instances
+        if instance.image
+    ]
+    return ThumbnailJob.objects.bulk_create(jobs)
+
+
+def enqueue_missing(model_name, regenerate=False, batch_size=1000):
+    """Queue every row of a model that has an image but no thumbnail (or every row when regenerating)."""
+    rows = get_model(model_name).objects.exclude(image="")
+    if not regenerate:
+        rows = rows.filter(Q(thumbnail="") | Q(thumbnail__isnull=True))
+    queued = 0
+    batch = []
+    for pk in rows.values_list("pk", flat=True).iterator(chunk_size=batch_size):
+        batch.append(ThumbnailJob(model=model_name, object_id=pk))
+        if len(batch) == batch_size:
+            queued += len(ThumbnailJob.objects.bulk_create(batch))
+            batch = []
+    if batch:
+        queued += len(ThumbnailJob.objects.bulk_create(batch))
+    return queued
+
+
+def claim_jobs(limit):
+    """Mark up to ``limit`` pending jobs as running; concurrent workers never get the same job."""
+    with transaction.atomic():
+        ThumbnailJob.objects.filter(
+            status=ThumbnailJob.RUNNING, updated_at__lt=timezone.now() - STALE_AFTER
+        ).update(status=ThumbnailJob.PENDING)
+        jobs = list(
+            ThumbnailJob.objects.select_for_update(skip_locked=True)
+            .filter(status=ThumbnailJob.PENDING)
+            .order_by("id")[:limit]
+        )
+        ThumbnailJob.objects.filter(pk__in=[job.pk for job in jobs]).update(
+            status=ThumbnailJob.RUNNING, attempts=F("attempts") + 1, updated_at=timezone.now()
+        )
+    return jobs
+
+
+def generate_thumbnail(model_name, object_id):
+    model = get_model(model_name)
+    instance = model.objects.filter(pk=object_id).first()
+    if instance is None or not instance.image:
+        return False
+
+    old_name = instance.thumbnail.name
+    name = PurePosixPath(instance.image.name).stem + ".webp"
+    instance.thumbnail.save(name, render_thumbnail(instance.image), save=False)
+    # update() rather than save() so the post_save hook does not queue the row again
+    model.objects.filter(pk=object_id).update(thumbnail=instance.thumbnail.name)
+    if old_name and old_name != instance.thumbnail.name:
+        delete_file_on_commit(instance.thumbnail.storage, old_name)
+
+    if model_name == "productimage":
+        Product.objects.filter(pk=instance.product_id).update(updated_at=timezone.now())
+        bump_version_on_commit(CATALOG_VERSION_KEY)
+    else:
+        bump_version_on_commit(CATEGORY_TREE_VERSION_KEY)
+    return True
+
+
+def process_jobs(limit=50):
+    """Run one batch of jobs; returns how many were claimed."""
+    jobs = claim_jobs(limit)
+    for job in jobs:
+        try:
+            generate_thumbnail(job.model, job.object_id)
+        except Exception as e:
+            failed = job.attempts + 1 >= MAX_ATTEMPTS
+            ThumbnailJob.objects.filter(pk=job.pk).update(
+                status=ThumbnailJob.FAILED if failed else ThumbnailJob.PENDING, error=str(e)
+            )
+        else:
+            ThumbnailJob.objects.filter(pk=job.pk).update(status=ThumbnailJob.DONE, error="")
+    return len(jobs)
@@ -0,0 +1,67 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import transaction
+
+from .cache import CATALOG_VERSION_KEY, bump_version_on_commit
+from .models import ProductImage
+from .thumbnails import enqueue
+
+
+def _delete_quietly(storage, names):
+    for name in names:
+        try:
+            storage.delete(name)
+        except Exception:
+            pass
+
+
+def create_with_images(create_product, files):
+    """
+    Upload ``files`` to storage concurrently, then call ``create_product()`` and insert the
+    image rows with one bulk_create, in one transaction. Returns (product, images).
+
+    The uploads happen before the transaction opens, so no database locks are held while
+    they run; latency follows the slowest upload instead of the sum of all of them. If any
+    upload, ``create_product()`` or the insert fails, every file that did reach storage is
+    deleted and the error re-raised.
+    """
+    field = ProductImage._meta.get_field("image")
+    storage = field.storage
+    saved = _upload(field, files)
+    try:
+        with transaction.atomic():
+            product = create_product()
+            images = ProductImage.objects.bulk_create(ProductImage(product=product, image=name) for name in saved)
+            if images:
+                # bulk_create skips post_save, so queue thumbnails and invalidate the catalog here
+                enqueue(images)
+                bump_version_on_commit(CATALOG_VERSION_KEY)
+    except Exception:
+        _delete_quietly(storage, saved)
+        raise
+    return product, images
+
+
+def _upload(field, files):
+    if not files:
+        return []
+    storage = field.storage
+
+    def upload(file):
+        name = field.generate_filename(None, file.name)
+        return storage.save(name, file, max_length=field.max_length)
+
+    workers = min(len(files), getattr(settings, "PRODUCT_IMAGE_UPLOAD_WORKERS", 8))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(upload, file) for file in files]
+    saved, error = [], None
+    for future in futures:
+        try:
+            saved.append(future.result())
+        except Exception as e:
+            error = error or e
+    if error is not None:
+        _delete_quietly(storage, saved)
+        raise error
+    return saved
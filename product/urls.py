@@ -1,6 +1,7 @@
 from django.urls import path
-from .views import (CartView, CreateOrderView, CreateProductView, CategoryListView, SubcategoryByCategoryView, ProductBySubcategoryView, ProductView, ProductDetail, CategoryCreateViewByAdmin,
+from .views import (CartBulkView, CartSummaryView, CartView, ProductFacetView, ProductFilterView, ProductSearchView, CreateOrderView, CreateProductView, CategoryListView, SubcategoryByCategoryView, ProductBySubcategoryView, ProductView, ProductDetail, CategoryCreateViewByAdmin,
                     ProductCreateViewByAdmin, SpecificPoductView)
+from .async_views import AsyncCategoryListView, AsyncProductDetailView, AsyncProductView, AsyncSubcategoryByCategoryView
 
 urlpatterns=[
     path("order", CreateOrderView.as_view(), name="create-order"),
@@ -9,11 +10,21 @@ urlpatterns=[
     path("sub-category/<int:category_id>",SubcategoryByCategoryView.as_view(), name="sub-category"),
     path("product-subcatgeory/<int:subcategory_id>",ProductBySubcategoryView.as_view(), name="product-subcatgeory"),
     path("products", ProductView.as_view(), name="products"),
-    path("product-detail/<uuid:product_id>", ProductDetail.as_view(), name="product-detail"),
+    path("products/search", ProductSearchView.as_view(), name="product-search"),
+    path("products/filter", ProductFilterView.as_view(), name="product-filter"),
+    path("products/facets", ProductFacetView.as_view(), name="product-facets"),
+    path("product-detail/<int:product_id>", ProductDetail.as_view(), name="product-detail"),
     path("cart", CartView.as_view(), name="cart"),
     path("cart/<int:cart_id>", CartView.as_view(), name="cart"),
+    path("cart/summary", CartSummaryView.as_view(), name="cart-summary"),
+    path("cart/bulk", CartBulkView.as_view(), name="cart-bulk"),
     path("categories", CategoryCreateViewByAdmin.as_view(),name="categories"),
     path("admin/products", ProductCreateViewByAdmin.as_view(),name="products"),
-    path("products/<int:product_id>", SpecificPoductView.as_view(), name="specific-product")
+    path("products/<int:product_id>", SpecificPoductView.as_view(), name="specific-product"),
+    # Native async twins of the read-heavy catalog endpoints, for ASGI deployments
+    path("async/category", AsyncCategoryListView.as_view(), name="async-category"),
+    path("async/sub-category/<int:category_id>", AsyncSubcategoryByCategoryView.as_view(), name="async-sub-category"),
+    path("async/products", AsyncProductView.as_view(), name="async-products"),
+    path("async/products/<int:product_id>", AsyncProductDetailView.as_view(), name="async-specific-product"),
 ]
 #/categories
\ No newline at end of file
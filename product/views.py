@@ -1,14 +1,43 @@
 import json
+from django.conf import settings
 from django.http import QueryDict
 from django.shortcuts import get_object_or_404, render
 from rest_framework.views import APIView
 from rest_framework import status
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from .pagination import ProductPagination
+from .pagination import ProductCursorPagination, ProductPagination
+from .search import search_products
+from .facets import filter_by_options, get_facets, parse_selections
+from .cache import catalog_response_key, get_cached_categories, get_cached_subcategories, get_or_build
+from .conditional import not_modified_response, set_validators
+from .pricing import PricingError, parse_id, parse_quantity, validate_quantity
+from .uploads import create_with_images
 from .models import Cart, Product, Order, ProductImage, Size, Printing, Category, Subcategory
-from .serializers import CartSerializer, OrderSerializer, ProductSerializer, CategorySerializer, SubcategorySerializer
+from .serializers import CartSerializer, OrderSerializer, ProductSerializer, CategorySerializer, SubcategorySerializer, ProductSearchSerializer, ProductListSerializer
 from rest_framework.parsers import MultiPartParser, FormParser
+from my_project.pagination import get_paginator
+from my_project.routers import ReplicaReadMixin
+
+# Query parameters that select a different product-listing response
+LISTING_PARAMS = ("category_id", "page", "page_size", "cursor", "pagination")
+
+
+def requested_fields(request, serializer_class):
+    """Field names from ?fields=a,b (None when absent); unknown names raise ValueError."""
+    value = request.query_params.get("fields")
+    if not value:
+        return None
+    fields = sorted({name.strip() for name in value.split(",") if name.strip()})
+    unknown = set(fields) - set(serializer_class.Meta.fields)
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}.")
+    return fields
+
+
+def product_etag(product_id, updated_at):
+    return f"product-{product_id}-{updated_at.timestamp():.6f}"
+
 
 # Create your views here.
 class CreateOrderView(APIView):
@@ -68,62 +97,136 @@ class CreateProductView(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-class ProductView(APIView):
+class ProductView(ReplicaReadMixin, APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self,request):
-        products = Product.objects.all()
-        serializer = ProductSerializer(products, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        try:
+            fields = requested_fields(request, ProductSerializer)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        category_id = request.query_params.get("category_id")
+        if category_id and not category_id.isdigit():
+            return Response({"error": "category_id must be an integer."}, status=status.HTTP_400_BAD_REQUEST)
+
+        variant = {"category_id": category_id or "", "fields": ",".join(fields or [])}
+        key = catalog_response_key("products", variant)
+        # The key already names the catalog version and the variant
+        etag = key.removeprefix("catalog:response:").replace(":", "-")
+        not_modified = not_modified_response(request, etag)
+        if not_modified is not None:
+            return not_modified
+
+        def build():
+            products = Product.objects.with_related().order_by("id")
+            if category_id:
+                products = products.filter(category_id=category_id)
+            return ProductSerializer(products, many=True, fields=fields).data
+
+        payload, current = get_or_build(key, build, stale_key=catalog_response_key("products", variant, latest=True))
+        response = Response(payload, status=status.HTTP_200_OK)
+        if not current:
+            # Served while the new catalog version is being built; don't let the client keep it under the new ETag
+            response["Cache-Control"] = "private, no-cache"
+            return response
+        return set_validators(response, etag)
+
+
+class ProductSearchView(ReplicaReadMixin, APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        """Ranked full-text search over name, category, description and option values (?q=...)."""
+        text = request.query_params.get("q", "").strip()
+        if not text:
+            return Response({"error": "q is required."}, status=status.HTTP_400_BAD_REQUEST)
 
+        products = search_products(Product.objects.with_related(), text)
+        paginator = ProductPagination()
+        page = paginator.paginate_queryset(products, request)
+        serializer = ProductSearchSerializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
 
-class CategoryListView(APIView):
+
+class ProductFilterView(ReplicaReadMixin, APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        categories = Category.objects.all()
-        serializer = CategorySerializer(categories, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        """Products matching option filters: ?option=paper:glossy&option=colors:red (same key = any of)."""
+        try:
+            selections = parse_selections(request.query_params.getlist("option"))
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        category_id = request.query_params.get("category_id")
+        if category_id and not category_id.isdigit():
+            return Response({"error": "category_id must be an integer."}, status=status.HTTP_400_BAD_REQUEST)
+
+        products = filter_by_options(Product.objects.with_related(), selections).order_by("id")
+        if category_id:
+            products = products.filter(category_id=category_id)
+        paginator = ProductPagination()
+        page = paginator.paginate_queryset(products, request)
+        serializer = ProductListSerializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
+
+
+class ProductFacetView(ReplicaReadMixin, APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        """Precomputed product counts per option key/value for the facet sidebar."""
+        return Response(get_facets(), status=status.HTTP_200_OK)
+
+
+class CategoryListView(ReplicaReadMixin, APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        return Response(get_cached_categories(), status=status.HTTP_200_OK)
 
 
 
-class SubcategoryByCategoryView(APIView):
+class SubcategoryByCategoryView(ReplicaReadMixin, APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request, category_id):
-        category = get_object_or_404(Category, id=category_id)
-        subcategories = Subcategory.objects.filter(parent_category=category)
-        serializer = SubcategorySerializer(subcategories, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        return Response(get_cached_subcategories(category_id), status=status.HTTP_200_OK)
 
 
-class ProductBySubcategoryView(APIView):
+class ProductBySubcategoryView(ReplicaReadMixin, APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request, subcategory_id):
         subcategory = get_object_or_404(Subcategory, id=subcategory_id)
-        products = Product.objects.filter(subcategory=subcategory)
+        # Products are attached to categories, so list the subcategory's parent category
+        products = Product.objects.with_related().filter(category_id=subcategory.parent_category_id)
         serializer = ProductSerializer(products, many=True)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
 
 
-class ProductDetail(APIView):
+class ProductDetail(ReplicaReadMixin, APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self,request,product_id):
-        product = Product.objects.get(id=product_id)
+        updated_at = get_object_or_404(Product.objects.values_list("updated_at", flat=True), id=product_id)
+        etag = product_etag(product_id, updated_at)
+        not_modified = not_modified_response(request, etag, updated_at)
+        if not_modified is not None:
+            return not_modified
+
+        product = Product.objects.with_related().get(id=product_id)
         serializer = ProductSerializer(product)
-        return Response(serializer.data,status=status.HTTP_200_OK)
+        etag = product_etag(product.id, product.updated_at)
+        return set_validators(Response(serializer.data,status=status.HTTP_200_OK), etag, product.updated_at)
     
 class CartView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
         """Retrieve all cart items for the logged-in user."""
-        cart = Cart.objects.all()
-        cart_items = Cart.objects.filter(user=request.user)
-        print(cart_items,'---------------')
+        cart_items = Cart.objects.filter(user=request.user).with_totals()
         serializer = CartSerializer(cart_items, many=True)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
@@ -132,20 +235,20 @@ class CartView(APIView):
         product_id = request.data.get("product")
         size_id = request.data.get("size")
         printing_id = request.data.get("printing")
-        quantity = int(request.data.get("quantity", 1))
 
         try:
             product = Product.objects.get(id=product_id)
+            quantity = parse_quantity(request.data.get("quantity", 1))
+            validate_quantity(product, quantity)
             size = Size.objects.get(id=size_id) if size_id else None
             printing = Printing.objects.get(id=printing_id) if printing_id else None
 
-            cart_item, created = Cart.objects.get_or_create(
-                user=request.user, product=product, size=size, printing=printing,
-                defaults={"quantity": quantity}
-            )
-            if not created:
-                cart_item.quantity += quantity  # Update quantity if the item already exists
-                cart_item.save()
+            # Insert or bump the quantity atomically, so concurrent adds of the same line don't race
+            cart_ids = Cart.objects.upsert_lines(request.user, [{
+                "product_id": product.id, "size_id": size.id if size else None,
+                "printing_id": printing.id if printing else None, "quantity": quantity,
+            }])
+            cart_item = Cart.objects.with_totals().get(id=cart_ids[0])
 
             serializer = CartSerializer(cart_item)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
@@ -156,6 +259,8 @@ class CartView(APIView):
             return Response({"error": "Size not found"}, status=status.HTTP_404_NOT_FOUND)
         except Printing.DoesNotExist:
             return Response({"error": "Printing option not found"}, status=status.HTTP_404_NOT_FOUND)
+        except PricingError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
         
 
     def put(self, request, cart_id):
@@ -200,7 +305,75 @@ class CartView(APIView):
             return Response({"error": "Item not found in cart"}, status=status.HTTP_404_NOT_FOUND)
 
 
-class CategoryCreateViewByAdmin(APIView):
+class CartBulkView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        """
+        Add or update many cart lines in one statement.
+
+        Body: {"mode": "add" | "set", "items": [{"product", "size", "printing", "quantity"}, ...]}
+        "add" increments existing quantities, "set" overwrites them.
+        """
+        mode = request.data.get("mode", "add")
+        items = request.data.get("items")
+        if mode not in ("add", "set"):
+            return Response({"error": "mode must be add or set."}, status=status.HTTP_400_BAD_REQUEST)
+        if not isinstance(items, list) or not items:
+            return Response({"error": "items must be a non-empty list."}, status=status.HTTP_400_BAD_REQUEST)
+        max_items = getattr(settings, "CART_BULK_MAX_ITEMS", 200)
+        if len(items) > max_items:
+            return Response({"error": f"At most {max_items} items can be added at once."}, status=status.HTTP_400_BAD_REQUEST)
+
+        lines, errors = [], []
+        for index, item in enumerate(items):
+            if not isinstance(item, dict) or item.get("product") in (None, ""):
+                errors.append({"index": index, "error": "product is required."})
+                continue
+            try:
+                line = {
+                    "product_id": parse_id(item["product"], "product"),
+                    "size_id": parse_id(item.get("size") or None, "size"),
+                    "printing_id": parse_id(item.get("printing") or None, "printing"),
+                    "quantity": parse_quantity(item.get("quantity", 1)),
+                }
+            except PricingError as e:
+                errors.append({"index": index, "error": str(e)})
+                continue
+            lines.append((index, line))
+
+        products = Product.objects.in_bulk({line["product_id"] for _, line in lines})
+        sizes = Size.objects.in_bulk({line["size_id"] for _, line in lines if line["size_id"]})
+        printings = Printing.objects.in_bulk({line["printing_id"] for _, line in lines if line["printing_id"]})
+        for index, line in lines:
+            if line["product_id"] not in products:
+                errors.append({"index": index, "error": "Product not found"})
+            elif line["size_id"] and line["size_id"] not in sizes:
+                errors.append({"index": index, "error": "Size not found"})
+            elif line["printing_id"] and line["printing_id"] not in printings:
+                errors.append({"index": index, "error": "Printing option not found"})
+            else:
+                try:
+                    validate_quantity(products[line["product_id"]], line["quantity"])
+                except PricingError as e:
+                    errors.append({"index": index, "error": str(e)})
+        if errors:
+            return Response({"errors": sorted(errors, key=lambda e: e["index"])}, status=status.HTTP_400_BAD_REQUEST)
+
+        cart_ids = Cart.objects.upsert_lines(request.user, [line for _, line in lines], mode=mode)
+        cart_items = Cart.objects.filter(id__in=cart_ids).with_totals().order_by("id")
+        return Response(CartSerializer(cart_items, many=True).data, status=status.HTTP_200_OK)
+
+
+class CartSummaryView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        """Item count, subtotal, design, delivery, VAT and total of the user's cart, computed in one query."""
+        return Response(Cart.objects.filter(user=request.user).summary(), status=status.HTTP_200_OK)
+
+
+class CategoryCreateViewByAdmin(ReplicaReadMixin, APIView):
     permission_classes = [IsAuthenticated]
 
     def post(self, request):
@@ -219,15 +392,13 @@ class CategoryCreateViewByAdmin(APIView):
 
     def get(self,request):
         try:
-            category_data = Category.objects.all()
-            serializer = CategorySerializer(category_data,many=True)
-            return Response(serializer.data, status=status.HTTP_200_OK)
+            return Response(get_cached_categories(), status=status.HTTP_200_OK)
         except Exception as e:
             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
 
-class ProductCreateViewByAdmin(APIView):
+class ProductCreateViewByAdmin(ReplicaReadMixin, APIView):
     permission_classes = [IsAuthenticated]  
     parser_classes = (MultiPartParser, FormParser)  # Allow form-data parsing
 
@@ -251,12 +422,9 @@ class ProductCreateViewByAdmin(APIView):
             # Serialize and validate product data
             serializer = ProductSerializer(data=data)
             if serializer.is_valid():
-                product = serializer.save()
-
-                # Handle image uploads (if any)
-                images = request.FILES.getlist("images")  # Expecting multiple images
-                for image in images:
-                    ProductImage.objects.create(product=product, image=image)
+                # Images (if any) are uploaded in parallel before the product row is inserted;
+                # a failed upload means no product, a failed insert deletes the uploads
+                create_with_images(serializer.save, request.FILES.getlist("images"))
 
                 return Response(
                     {"message": "Product created successfully!", "product": serializer.data}, 
@@ -273,28 +441,50 @@ class ProductCreateViewByAdmin(APIView):
 
     def get(self, request):
         try:
+            fields = requested_fields(request, ProductSerializer)
             category_id = request.query_params.get('category_id')
-            products = Product.objects.filter(category_id=category_id) if category_id else Product.objects.all()
+            # Page links are absolute, so the scheme and host are part of the variant too
+            params = {name: request.query_params.get(name, "") for name in LISTING_PARAMS}
+            variant = {**params, "fields": ",".join(fields or []), "origin": request.build_absolute_uri("/")}
+            key = catalog_response_key("admin-products", variant)
+
+            def build():
+                products = Product.objects.with_related().order_by("id")
+                if category_id:
+                    products = products.filter(category_id=category_id)
 
-            # Apply pagination
-            paginator = ProductPagination()
-            paginated_products = paginator.paginate_queryset(products, request)
+                # Apply pagination (?pagination=cursor switches to keyset pages)
+                paginator = get_paginator(request, ProductPagination, ProductCursorPagination)
+                paginated_products = paginator.paginate_queryset(products, request)
 
-            serializer = ProductSerializer(paginated_products, many=True)
-            return paginator.get_paginated_response(serializer.data)
+                serializer = ProductSerializer(paginated_products, many=True, fields=fields)
+                return paginator.get_paginated_response(serializer.data).data
 
+            payload, _ = get_or_build(key, build, stale_key=catalog_response_key("admin-products", variant, latest=True))
+            return Response(payload, status=status.HTTP_200_OK)
+
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
         except Exception as e:
             return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
-class SpecificPoductView(APIView):
+class SpecificPoductView(ReplicaReadMixin, APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request, product_id):
         try:
-            product = Product.objects.get(id=product_id)  
-            serializer = ProductSerializer(product)  
-            return Response(serializer.data, status=status.HTTP_200_OK)
+            # Answer conditional requests from the timestamp alone, before loading or serializing
+            updated_at = Product.objects.values_list("updated_at", flat=True).get(id=product_id)
+            etag = product_etag(product_id, updated_at)
+            not_modified = not_modified_response(request, etag, updated_at)
+            if not_modified is not None:
+                return not_modified
+
+            product = Product.objects.with_related().get(id=product_id)
+            serializer = ProductSerializer(product)
+            etag = product_etag(product.id, product.updated_at)
+            return set_validators(Response(serializer.data, status=status.HTTP_200_OK), etag, product.updated_at)
         except Product.DoesNotExist:
             return Response({"error": "Product not found"}, status=status.HTTP_404_NOT_FOUND)
         except Exception as e: